@@ -0,0 +1,612 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the Contact Manager 2.0 project.
+
+Generates a large, deterministic set of fake contacts and times the storage
+features against the simple approach they replace.
+
+Usage:
+    python benchmark.py fuzzy [--sizes 100000 1000000]
+    python benchmark.py parallel [--sizes ...] [--workers 2 4 8]
+    python benchmark.py startup [--sizes ...]
+    python benchmark.py stress [--writers 4] [--ops 200] [--journal]
+    python benchmark.py threads [--size 100000] [--threads 1 4 8] [--writes 0 1 10 50]
+    python benchmark.py import [--users 50000] [--workers 1 8 32] [--latency 0.2]
+    python benchmark.py file [--sizes 100000 1000000]
+    python benchmark.py dedupe [--sizes 100000 1000000]
+    python benchmark.py query [--sizes 100000 1000000]
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+import importers
+from contact import Contact
+from dedupe import DuplicateFinder
+import formats
+from indexes import edit_distance
+from parallel import ParallelScanner
+from query import parse
+from storage import ContactStorage
+
+
+SYLLABLES = ["an", "be", "ca", "da", "el", "fi", "ga", "ha", "is", "jo", "ka",
+             "li", "ma", "ne", "ol", "pe", "ra", "sa", "ta", "ul", "va", "yo"]
+DOMAINS = ["example.com", "gmail.com", "yahoo.com", "mail.org", "corp.net"]
+PHONE_FORMATS = ["{}{}{}-{}{}{}-{}{}{}{}", "({}{}{}) {}{}{} {}{}{}{}", "{}{}{}{}{}{}{}{}{}{}"]
+
+
+def make_word(rng, syllables):
+    """A pronounceable made-up word, capitalized."""
+    return "".join(rng.choice(SYLLABLES) for _ in range(syllables)).capitalize()
+
+
+def make_contacts(n, seed=42):
+    """
+    Generate `n` distinct fake contacts, always the same ones for a seed.
+    
+    Names are drawn from a pool of first and last names so, like real
+    data, many contacts share a first name or a last name.
+    
+    Args:
+        n (int): Number of contacts
+        seed (int): Random seed
+    
+    Returns:
+        list: Contact objects
+    """
+    rng = random.Random(seed)
+    first_names = sorted({make_word(rng, rng.randint(2, 3)) for _ in range(2000)})
+    last_names = sorted({make_word(rng, rng.randint(2, 4)) for _ in range(max(n // 20, 100))})
+    
+    contacts = []
+    for i in range(n):
+        first = rng.choice(first_names)
+        last = rng.choice(last_names)
+        digits = f"{rng.randrange(10 ** 9):09d}{i % 10}"
+        phone = rng.choice(PHONE_FORMATS).format(*digits)
+        email = None
+        if rng.random() < 0.8:
+            email = f"{first}.{last}{i}@{rng.choice(DOMAINS)}".lower()
+        contacts.append(Contact(f"{first} {last}", phone, email))
+    return contacts
+
+
+def _typo(rng, word):
+    """Misspell a word: drop, double or swap one letter."""
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.randrange(3)
+    if kind == 0:
+        return word[:i] + word[i + 1:]
+    if kind == 1:
+        return word[:i] + word[i] + word[i:]
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def _variant(rng, contact):
+    """
+    The same person as typed by someone else: the kind of near-duplicate
+    a real import brings in.
+    """
+    first, last = contact.name.split(" ", 1)
+    changes = rng.sample(["typo", "initial", "swap", "case", "phone", "email"], rng.randint(1, 3))
+    if "typo" in changes:
+        if rng.random() < 0.5:
+            first = _typo(rng, first)
+        else:
+            last = _typo(rng, last)
+    name = f"{first} {last}"
+    if "initial" in changes:
+        name = f"{first} {rng.choice('ABCDEFGHJKLMNPRSTW')}. {last}"
+    if "swap" in changes:
+        name = rng.choice([f"{last} {first}", f"{last}, {first}"])
+    if "case" in changes:
+        name = rng.choice([name.upper(), name.lower()])
+    
+    phone = contact.phone
+    if "phone" in changes:
+        # Same number, written differently
+        digits = contact.phone_digits
+        phone = rng.choice(PHONE_FORMATS + ["+1 {}{}{}-{}{}{}-{}{}{}{}"]).format(*digits)
+    email = contact.email
+    if "email" in changes and email:
+        local, domain = email.split("@")
+        email = rng.choice([email.upper(), f"{local}+shop@{domain}", None])
+    return Contact(name, phone, email)
+
+
+def make_near_duplicates(n, duplicates=0.1, relatives=0.02, seed=42):
+    """
+    Generate `n` fake contacts of which some are near-duplicates of others,
+    always the same ones for a seed.
+    
+    Starts from make_contacts() and adds one or two re-typed copies of a
+    share of the people: misspelled names, a middle initial, swapped name
+    order, another phone format, changed email. Each copy keeps at least
+    one detail that ties it to the original. To make it harder, some
+    people get a relative: same last name and phone, but another person.
+    
+    Args:
+        n (int): Number of contacts in total
+        duplicates (float): Share of the contacts that are copies
+        relatives (float): Share of the contacts that are relatives
+        seed (int): Random seed
+    
+    Returns:
+        tuple: (contacts, groups); groups lists the positions of the
+            contacts that are really the same person, one list per person
+            who has copies
+    """
+    rng = random.Random(seed)
+    copies = int(n * duplicates)
+    originals = make_contacts(n - copies, seed)
+    contacts = list(originals)
+    groups = {}
+    for _ in range(int(n * relatives)):
+        # Replaces an original: a relative is nobody's duplicate
+        position = rng.randrange(len(originals))
+        first = make_word(rng, rng.randint(2, 3))
+        relative = originals[rng.randrange(len(originals))]
+        last = relative.name.split(" ", 1)[1]
+        contacts[position] = Contact(f"{first} {last}", relative.phone)
+    originals = contacts[:]
+    while len(contacts) < n:
+        position = rng.randrange(len(originals))
+        variant = _variant(rng, originals[position])
+        if variant.key != originals[position].key:
+            groups.setdefault(position, [position]).append(len(contacts))
+            contacts.append(variant)
+    
+    # Mix the copies in among the originals
+    order = list(range(n))
+    rng.shuffle(order)
+    where = {old: new for new, old in enumerate(order)}
+    contacts = [contacts[old] for old in order]
+    groups = sorted(sorted(where[p] for p in group) for group in groups.values())
+    return contacts, groups
+
+
+def make_storage(contacts, folder):
+    """A ContactStorage in `folder` holding the given contacts."""
+    with redirect_stdout(StringIO()):
+        storage = ContactStorage(Path(folder) / "contacts.json")
+        storage.add_many(contacts)
+    return storage
+
+
+def timed(function, repeat=3):
+    """Run a function `repeat` times; return (best seconds, last result)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_fuzzy(sizes):
+    """find_fuzzy (BK-tree) against edit distance on every contact."""
+    print("Fuzzy name search, max_distance=2 (best of 3)")
+    for n in sizes:
+        contacts = make_contacts(n)
+        # Misspell a real name: swap two letters of the first word
+        name = contacts[n // 2].name
+        query = name[1] + name[0] + name[2:]
+        
+        def naive():
+            words = query.lower().split()
+            hits = []
+            for contact in contacts:
+                name_words = contact.name.lower().split()
+                if all(min(edit_distance(w, nw) for nw in name_words) <= 2 for w in words):
+                    hits.append(contact)
+            return hits
+        
+        with tempfile.TemporaryDirectory() as folder:
+            storage = make_storage(contacts, folder)
+            build, _ = timed(lambda: storage.find_fuzzy(query), repeat=1)
+            indexed, results = timed(lambda: storage.find_fuzzy(query, limit=n))
+        scan, expected = timed(naive, repeat=1)
+        
+        assert {c.key for c in results} == {c.key for c in expected}
+        print(f"  {n:>9,} contacts, {len(results)} hits for {query!r}: "
+              f"index {indexed * 1000:.1f} ms (first call incl. build {build:.1f} s), "
+              f"scan {scan * 1000:.0f} ms, {scan / indexed:.0f}x faster")
+
+
+def bench_parallel(sizes, worker_counts):
+    """ParallelScanner against the one-core list comprehension."""
+    print(f"Full-scan search for 'an' ({os.cpu_count()} CPUs, best of 3)")
+    for n in sizes:
+        contacts = make_contacts(n)
+        serial, expected = timed(lambda: [c for c in contacts if c.matches("an")])
+        print(f"  {n:>9,} contacts: serial {serial * 1000:.0f} ms")
+        
+        for workers in worker_counts:
+            start = time.perf_counter()
+            scanner = ParallelScanner(contacts, workers)
+            startup = time.perf_counter() - start
+            try:
+                seconds, results = timed(lambda: scanner.find("an"))
+            finally:
+                scanner.close()
+            assert results == expected
+            print(f"    {workers:>2} workers: {seconds * 1000:.0f} ms "
+                  f"({serial / seconds:.2f}x), pool start {startup * 1000:.0f} ms")
+
+
+def bench_startup(sizes):
+    """Opening a ContactStorage from the JSON file against the snapshot."""
+    print("Startup: ContactStorage() on an existing file (best of 3)")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            make_storage(make_contacts(n), folder)  # writes JSON and snapshot
+            path = Path(folder) / "contacts.json"
+            
+            def open_storage(snapshot):
+                with redirect_stdout(StringIO()):
+                    return ContactStorage(path, snapshot=snapshot)
+            
+            cold, from_json = timed(lambda: open_storage(False))
+            warm, from_snapshot = timed(lambda: open_storage(True))
+            assert from_snapshot.contacts == from_json.contacts
+            size = path.stat().st_size / 1e6
+            snap_size = from_snapshot.snapshot_path.stat().st_size / 1e6
+        print(f"  {n:>9,} contacts: JSON ({size:.1f} MB) {cold * 1000:.0f} ms, "
+              f"snapshot ({snap_size:.1f} MB) {warm * 1000:.0f} ms, "
+              f"{cold / warm:.1f}x faster")
+
+
+def stress_writer(path, writer, ops, journal):
+    """
+    One writer process for bench_stress.
+    
+    Adds `ops` contacts of its own and increments the shared counter
+    contact `ops` times (a read-modify-write, so it needs the file lock).
+    """
+    with redirect_stdout(StringIO()):
+        storage = ContactStorage(path, journal=journal, shared=True)
+        for i in range(ops):
+            storage.add(Contact(f"Writer {writer} Contact {i}", f"{writer}-{i}"))
+            with storage.batch():
+                count = int(storage.get_by_name("Counter").email.split("@")[0])
+                storage.update("Counter", email=f"{count + 1}@count")
+        storage.close()
+
+
+def bench_stress(writers, ops, journal):
+    """Several processes changing one shared file; checks nothing is lost."""
+    mode = "journal" if journal else "full rewrite"
+    print(f"Stress: {writers} writer processes x {ops} adds and counter "
+          f"increments ({mode})")
+    with tempfile.TemporaryDirectory() as folder:
+        path = Path(folder) / "contacts.json"
+        with redirect_stdout(StringIO()):
+            ContactStorage(path, journal=journal, shared=True).add(
+                Contact("Counter", "0", "0@count"))
+        
+        start = time.perf_counter()
+        processes = [multiprocessing.Process(target=stress_writer, args=(path, w, ops, journal))
+                     for w in range(writers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        seconds = time.perf_counter() - start
+        assert all(process.exitcode == 0 for process in processes), "a writer failed"
+        
+        with redirect_stdout(StringIO()):
+            storage = ContactStorage(path, journal=journal, shared=True)
+        count = int(storage.get_by_name("Counter").email.split("@")[0])
+        expected = {f"Writer {w} Contact {i}" for w in range(writers) for i in range(ops)}
+        names = {c.name for c in storage} - {"Counter"}
+        assert names == expected, f"{len(expected - names)} added contacts were lost"
+        assert count == writers * ops, f"counter is {count}, expected {writers * ops}"
+    
+    changes = 2 * writers * ops
+    print(f"  no lost updates: {len(expected)} contacts, counter {count}; "
+          f"{changes} changes in {seconds:.1f} s ({changes / seconds:.0f}/s)")
+
+
+def bench_threads(size, thread_counts, write_percents, seconds=2.0):
+    """
+    Threads sharing one ContactStorage, at several read/write mixes.
+    
+    Reads are find() calls (short and long queries) and full iterations;
+    writes add or remove a contact. Every result is checked, so a race
+    would show up as a failed assertion, not just a wrong number.
+    
+    Ends with a race check: one thread searching many different queries
+    while another adds contacts, with thread switches forced far more
+    often than usual, so a search and a change interleave at every step.
+    """
+    contacts = make_contacts(size + 10_000)
+    spare = contacts[size:]
+    rng = random.Random(1)
+    queries = sorted({c.name[:n].lower() for c in rng.sample(contacts, 300) for n in (2, 4)})
+    print(f"Threads: {size:,} contacts, {seconds:.0f} s per run (reads: find/iterate; "
+          f"writes: add/remove)")
+    
+    with tempfile.TemporaryDirectory() as folder:
+        storage = make_storage(contacts[:size], folder)
+        # Don't time the disk: the benchmark is about the locking
+        storage.save = lambda: True
+        
+        for percent in write_percents:
+            for threads in thread_counts:
+                counts = [0] * threads
+                errors = []
+                stop = time.perf_counter() + seconds
+                
+                def work(worker):
+                    rng = random.Random(worker)
+                    added = []
+                    try:
+                        while time.perf_counter() < stop:
+                            if rng.random() * 100 < percent:
+                                if added and rng.random() < 0.5:
+                                    assert storage.remove(added.pop().name)
+                                else:
+                                    contact = rng.choice(spare)
+                                    contact = Contact(f"{contact.name} {worker}", contact.phone)
+                                    if storage.add(contact):
+                                        added.append(contact)
+                            elif rng.random() < 0.01:
+                                assert sum(1 for _ in storage) > 0
+                            else:
+                                query = rng.choice(queries)
+                                assert all(c.matches(query) for c in storage.find(query))
+                            counts[worker] += 1
+                    except Exception as e:
+                        errors.append(e)
+                    finally:
+                        for contact in added:
+                            storage.remove(contact.name)
+                
+                workers = [threading.Thread(target=work, args=(w,)) for w in range(threads)]
+                # One redirect for all threads: redirect_stdout isn't thread-safe
+                with redirect_stdout(StringIO()):
+                    for worker in workers:
+                        worker.start()
+                    for worker in workers:
+                        worker.join()
+                assert not errors, errors[0]
+                print(f"  {percent:>3}% writes, {threads:>2} threads: "
+                      f"{sum(counts) / seconds:>8,.0f} ops/s")
+            assert len(storage) == size
+        
+        searches = race_find_add(storage, spare, seconds)
+        print(f"  find() vs add() race check: {searches:,} searches, no errors")
+
+
+def race_find_add(storage, spare, seconds):
+    """
+    Search while another thread adds contacts that match every search.
+    
+    The added names all contain one marker word and the searches are its
+    many different pieces, more than the search cache holds, so each
+    search is computed and cached, and each add patches the cached results
+    of the searches in flight. Thread switches are forced far more often
+    than usual so the two interleave at every step. Raises the first error
+    the searching thread ran into.
+    
+    Returns:
+        int: Number of searches done
+    """
+    marker = "racecheckwithoneverylongmarkerword"
+    queries = sorted({marker[i:j] for i in range(len(marker)) for j in range(i + 3, len(marker) + 1)})
+    stop = time.perf_counter() + seconds
+    errors = []
+    searches = 0
+    added = []
+    
+    def add():
+        while time.perf_counter() < stop and not errors:
+            contact = spare[len(added) % len(spare)]
+            contact = Contact(f"{contact.name} {marker} {len(added)}", contact.phone)
+            storage.add(contact)
+            added.append(contact)
+    
+    def find():
+        nonlocal searches
+        try:
+            while time.perf_counter() < stop:
+                for query in queries:
+                    assert all(c.matches(query) for c in storage.find(query))
+                    searches += 1
+        except Exception as e:
+            errors.append(e)
+    
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=add), threading.Thread(target=find)]
+        with redirect_stdout(StringIO()):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    with redirect_stdout(StringIO()):
+        for contact in added:
+            storage.remove(contact.name)
+    assert not errors, repr(errors[0])
+    return searches
+
+
+def bench_import(users, worker_counts, latency, page_size=500, fail_every=10):
+    """
+    import_users() against a local stand-in API, with 1..N requests at once.
+    
+    The stand-in server waits `latency` seconds per page, like a real API
+    far away, and answers every `fail_every`-th request with 429 or 503.
+    """
+    if not importers.available():
+        print("This benchmark needs the requests library: pip install requests")
+        return
+    pages = -(-users // page_size)
+    print(f"API import: {users:,} users in {pages} pages of {page_size}, "
+          f"{latency * 1000:.0f} ms per page, every {fail_every}th request fails")
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory() as folder, \
+                importers.StandInServer(latency, fail_every) as server:
+            storage = ContactStorage(Path(folder) / "contacts.json")
+            start = time.perf_counter()
+            with redirect_stdout(StringIO()):
+                fetched, added = importers.import_users(storage, users, server.url, workers,
+                                                        page_size=page_size, backoff=0.05)
+            seconds = time.perf_counter() - start
+            assert fetched == added == users == len(storage)
+            print(f"  {workers:>2} at once: {seconds:6.2f} s, {users / seconds:>8,.0f} users/s "
+                  f"({server.stats['requests']} requests on "
+                  f"{server.stats['connections']} connections)")
+
+
+def bench_file(sizes):
+    """import_file() against reading the CSV and calling add_many()."""
+    print("CSV import into an empty store, including the save")
+    for n in sizes:
+        contacts = make_contacts(n)
+        with tempfile.TemporaryDirectory() as folder:
+            path = Path(folder) / "import.csv"
+            with open(path, "w", newline="", encoding="utf-8") as file:
+                writer = csv.writer(file)
+                writer.writerow(formats.CSV_COLUMNS)
+                writer.writerows([c.name, c.phone, c.email or ""] for c in contacts)
+            
+            def add_many():
+                storage = ContactStorage(Path(folder) / "slow.json", snapshot=False)
+                with open(path, newline="", encoding="utf-8") as file:
+                    rows = csv.reader(file)
+                    next(rows)
+                    return storage.add_many(Contact(*row) for row in rows)
+            
+            def import_file():
+                storage = ContactStorage(Path(folder) / "fast.json", snapshot=False)
+                return storage.import_file(path)[0]
+            
+            with redirect_stdout(StringIO()):
+                slow, added = timed(add_many, repeat=1)
+                assert added == n
+                fast, added = timed(import_file, repeat=1)
+                assert added == n
+        print(f"  {n:>9,} rows: add_many {slow:.1f} s, import_file {fast:.1f} s "
+              f"({n / fast:,.0f} rows/s)")
+
+
+def bench_dedupe(sizes):
+    """DuplicateFinder on contacts with known near-duplicates."""
+    print("Duplicate clusters found, checked against the generated groups")
+    for n in sizes:
+        contacts, groups = make_near_duplicates(n)
+        finder = DuplicateFinder()
+        seconds, clusters = timed(lambda: finder.clusters(contacts), repeat=1)
+        
+        # Compare pairs: every two positions in one cluster count as a pair
+        def pairs(clusters):
+            return {(a, b) for cluster in clusters for a in cluster for b in cluster if a < b}
+        
+        true, found = pairs(groups), pairs(clusters)
+        precision = len(true & found) / len(found) if found else 1.0
+        recall = len(true & found) / len(true) if true else 1.0
+        naive = n * (n - 1) // 2
+        print(f"  {n:>9,} contacts: {seconds:.1f} s, precision {precision:.3f}, "
+              f"recall {recall:.3f}; scored {finder.stats['scored']:,} pairs "
+              f"instead of {naive:,}")
+
+
+def bench_query(sizes):
+    """ContactStorage.query() against checking the parsed query on every contact."""
+    print("Query language: planned index access vs full scan (best of 3, indexes built)")
+    for n in sizes:
+        contacts = make_contacts(n)
+        sample = contacts[n // 2]
+        last = sample.name.split()[-1].lower()
+        queries = [
+            f'name:="{sample.name}"',
+            f"name:{last[:3]}*",
+            f"phone:*{sample.phone_digits[-5:]}",
+            f"email:*@example.com AND name:{last}",
+            f"name:{last} OR phone:*{sample.phone_digits[-6:]}",
+            "NOT email: AND name:ka*",
+            "NOT email:",
+        ]
+        with tempfile.TemporaryDirectory() as folder:
+            storage = make_storage(contacts, folder)
+            for text in queries:
+                storage.query(text)  # Builds the indexes the plan uses
+            for text in queries:
+                tree = parse(text)
+                indexed, results = timed(lambda: storage.query(text))
+                scan, expected = timed(lambda: [c for c in contacts if tree.matches(c)], repeat=1)
+                assert results == expected
+                used = storage.explain(text).splitlines()[1].strip()
+                print(f"  {n:>9,} contacts, {text!r}: {len(results):,} rows, "
+                      f"{indexed * 1000:.1f} ms vs scan {scan * 1000:.0f} ms\n"
+                      f"      {used}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Contact Manager benchmarks")
+    sub = parser.add_subparsers(dest="benchmark", required=True)
+    fuzzy = sub.add_parser("fuzzy", help="typo-tolerant name search")
+    fuzzy.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    scan = sub.add_parser("parallel", help="process-pool full scans")
+    scan.add_argument("--sizes", type=int, nargs="+", default=[50_000, 200_000, 1_000_000])
+    scan.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    startup = sub.add_parser("startup", help="loading from JSON vs the snapshot")
+    startup.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    stress = sub.add_parser("stress", help="concurrent writer processes on one file")
+    stress.add_argument("--writers", type=int, default=4)
+    stress.add_argument("--ops", type=int, default=200)
+    stress.add_argument("--journal", action="store_true")
+    threads = sub.add_parser("threads", help="reader/writer threads on one storage")
+    threads.add_argument("--size", type=int, default=100_000)
+    threads.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8])
+    threads.add_argument("--writes", type=int, nargs="+", default=[0, 1, 10, 50])
+    api = sub.add_parser("import", help="concurrent import from a local stand-in API")
+    api.add_argument("--users", type=int, default=50_000)
+    api.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32])
+    api.add_argument("--latency", type=float, default=0.2)
+    bulk = sub.add_parser("file", help="bulk CSV import")
+    bulk.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    dupes = sub.add_parser("dedupe", help="near-duplicate detection")
+    dupes.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    lang = sub.add_parser("query", help="field queries planned over the indexes")
+    lang.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+    
+    if args.benchmark == "fuzzy":
+        bench_fuzzy(args.sizes)
+    elif args.benchmark == "parallel":
+        bench_parallel(args.sizes, args.workers)
+    elif args.benchmark == "startup":
+        bench_startup(args.sizes)
+    elif args.benchmark == "stress":
+        bench_stress(args.writers, args.ops, args.journal)
+    elif args.benchmark == "threads":
+        bench_threads(args.size, args.threads, args.writes)
+    elif args.benchmark == "import":
+        bench_import(args.users, args.workers, args.latency)
+    elif args.benchmark == "file":
+        bench_file(args.sizes)
+    elif args.benchmark == "dedupe":
+        bench_dedupe(args.sizes)
+    elif args.benchmark == "query":
+        bench_query(args.sizes)
+
+
+if __name__ == "__main__":
+    main()
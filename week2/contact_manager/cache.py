@@ -0,0 +1,130 @@
+"""
+Search result cache for the Contact Manager 2.0 project.
+
+People run the same searches again and again ("gmail", an area code). The
+QueryCache remembers the ids that matched recent queries, so a repeated
+search costs a dictionary lookup instead of a scan.
+
+Cached results are never allowed to go stale. Every entry records the
+storage generation (a counter ContactStorage bumps on each change) it is
+valid for. When a contact is added, removed or changed, the storage tells
+the cache, which patches every current entry for that one contact and moves
+it to the new generation. Anything the cache wasn't told about (a reload, for
+example) leaves entries behind on an old generation, and those are ignored.
+"""
+
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+
+class QueryCache:
+    """
+    Least-recently-used cache of search results (sorted id lists).
+    
+    Attributes:
+        maxsize (int): Most queries kept
+        max_results (int): Results longer than this are not cached
+        hits (int): Searches answered straight from the cache
+        misses (int): Searches that had to be computed
+        narrowed (int): Misses that only had to check a cached, shorter
+            query's results
+    """
+    
+    def __init__(self, maxsize=128, max_results=100_000):
+        """
+        Initialize the cache.
+        
+        Args:
+            maxsize (int): Most queries kept (0 turns the cache off)
+            max_results (int): Don't cache results longer than this
+        """
+        self.maxsize = maxsize
+        self.max_results = max_results
+        self.hits = self.misses = self.narrowed = 0
+        self._entries = OrderedDict()  # query -> [generation, sorted ids]
+    
+    def get(self, query, generation):
+        """
+        Look up a query's cached result.
+        
+        Args:
+            query (str): Lower-cased query
+            generation (int): The storage's current generation
+        
+        Returns:
+            list or None: Sorted ids, or None if not cached
+        """
+        entry = self._entries.get(query)
+        if entry is None or entry[0] != generation:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(query)
+        self.hits += 1
+        return entry[1]
+    
+    def narrower(self, query, generation):
+        """
+        Find a cached result that contains every result of `query`.
+        
+        If a cached query is part of `query` ("ali" inside "alic"), anything
+        that matches "alic" also matches "ali", so only the cached "ali"
+        results need to be checked.
+        
+        Returns:
+            list or None: The smallest such cached id list, or None
+        """
+        best = None
+        for cached, (entry_generation, ids) in self._entries.items():
+            if (entry_generation == generation and cached in query
+                    and (best is None or len(ids) < len(best))):
+                best = ids
+        if best is not None:
+            self.narrowed += 1
+        return best
+    
+    def put(self, query, generation, ids):
+        """Cache the sorted ids that matched a query."""
+        if not self.maxsize or len(ids) > self.max_results:
+            return
+        self._entries[query] = [generation, ids]
+        self._entries.move_to_end(query)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    def changed(self, cid, contact, old_generation, new_generation):
+        """
+        Patch the cached results after one contact changed.
+        
+        Args:
+            cid (int): Id of the contact
+            contact (Contact or None): The contact as it is now, or None if
+                it was removed
+            old_generation (int): Generation before the change
+            new_generation (int): Generation after the change
+        """
+        for query, entry in self._entries.items():
+            if entry[0] != old_generation:
+                continue
+            ids = entry[1]
+            i = bisect_left(ids, cid)
+            present = i < len(ids) and ids[i] == cid
+            wanted = contact is not None and contact.matches(query)
+            if present and not wanted:
+                del ids[i]
+            elif wanted and not present:
+                insort(ids, cid)
+            entry[0] = new_generation
+    
+    def clear(self):
+        """Drop every cached result."""
+        self._entries.clear()
+    
+    def info(self):
+        """
+        Cache statistics.
+        
+        Returns:
+            dict: hits, misses, narrowed, size and maxsize
+        """
+        return {"hits": self.hits, "misses": self.misses, "narrowed": self.narrowed,
+                "size": len(self._entries), "maxsize": self.maxsize}
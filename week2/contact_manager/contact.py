@@ -5,8 +5,15 @@ This module defines the Contact class with proper OOP design including:
 - Constructor with validation
 - Dunder methods (__str__, __repr__, __eq__)
 - Serialization methods (to_dict, from_dict)
+- Properties and __slots__ (compact objects with cached lookup keys)
 """
 
+import re
+import sys
+
+
+NON_DIGITS = re.compile(r"[^0-9]")
+
 
 class Contact:
     """
@@ -16,6 +23,15 @@ class Contact:
         name (str): The contact's full name
         phone (str): The contact's phone number
         email (str, optional): The contact's email address
+        name_key (str): name.lower() (read-only)
+        email_key (str or None): email.lower() (read-only)
+        phone_digits (str): Just the digits of the phone (read-only), so
+            "123-456-7890" and "(123) 456 7890" both give "1234567890"
+    
+    Uses __slots__ instead of a per-object __dict__, which matters when there
+    are millions of contacts. The lower-cased keys used by __eq__, __hash__
+    and matches() are computed the first time they are needed and cached
+    until the field they come from is assigned again.
     
     Example:
         >>> contact = Contact("Alice", "123-456-7890", "alice@email.com")
@@ -23,6 +39,9 @@ class Contact:
         Alice - 123-456-7890 (alice@email.com)
     """
     
+    __slots__ = ("_name", "_phone", "_email",
+                 "_name_key", "_email_key", "_key", "_phone_digits")
+    
     def __init__(self, name, phone, email=None):
         """
         Initialize a new Contact.
@@ -40,9 +59,63 @@ class Contact:
         if not phone or not phone.strip():
             raise ValueError("Phone cannot be empty")
         
-        self.name = name.strip()
-        self.phone = phone.strip()
-        self.email = email.strip() if email else None
+        self._name = name.strip()
+        self._phone = phone.strip()
+        self._email = email.strip() if email else None
+        self._name_key = self._email_key = self._key = self._phone_digits = None
+    
+    @property
+    def name(self):
+        """The contact's full name."""
+        return self._name
+    
+    @name.setter
+    def name(self, value):
+        self._name = value
+        self._name_key = self._key = None
+    
+    @property
+    def phone(self):
+        """The contact's phone number."""
+        return self._phone
+    
+    @phone.setter
+    def phone(self, value):
+        self._phone = value
+        self._key = self._phone_digits = None
+    
+    @property
+    def email(self):
+        """The contact's email address (or None)."""
+        return self._email
+    
+    @email.setter
+    def email(self, value):
+        self._email = value
+        self._email_key = None
+    
+    @property
+    def name_key(self):
+        """The name, lower-cased (for case-insensitive lookups)."""
+        if self._name_key is None:
+            # Interned: many contacts share names, and the storage indexes
+            # reuse this exact string as a dictionary key.
+            self._name_key = sys.intern(self._name.lower())
+        return self._name_key
+    
+    @property
+    def phone_digits(self):
+        """The phone number with everything except the digits removed."""
+        if self._phone_digits is None:
+            self._phone_digits = NON_DIGITS.sub("", self._phone)
+        return self._phone_digits
+    
+    @property
+    def email_key(self):
+        """The email, lower-cased, or None if there is no email."""
+        if self._email_key is None and self._email:
+            self._email_key = self._email.lower()
+        return self._email_key
     
     def __str__(self):
         """Return a user-friendly string representation."""
@@ -58,11 +131,27 @@ class Contact:
         """Two contacts are equal if they have the same name and phone."""
         if not isinstance(other, Contact):
             return False
-        return self.name.lower() == other.name.lower() and self.phone == other.phone
+        return (self._key or self.key) == (other._key or other.key)
     
     def __hash__(self):
         """Make Contact hashable (for use in sets/dicts)."""
-        return hash((self.name.lower(), self.phone))
+        return hash(self._key or self.key)
+    
+    @property
+    def key(self):
+        """
+        The identity of the contact: case-folded name plus phone.
+        
+        This is what __eq__ and __hash__ compare, and what ContactStorage
+        uses to detect duplicates.
+        
+        Returns:
+            tuple: (name.lower(), phone)
+        """
+        # Cached until name or phone is assigned again
+        if self._key is None:
+            self._key = (self.name_key, self._phone)
+        return self._key
     
     def to_dict(self):
         """
@@ -78,12 +167,16 @@ class Contact:
         }
     
     @classmethod
-    def from_dict(cls, data):
+    def from_dict(cls, data, trusted=False):
         """
         Create a Contact from a dictionary.
         
         Args:
             data (dict): Dictionary with 'name', 'phone', and optional 'email'
+            trusted (bool): The data was written by to_dict() (for example
+                read back from our own storage), so it is already validated
+                and stripped. Skips the checks in __init__, which makes
+                bulk loading faster.
         
         Returns:
             Contact: A new Contact instance
@@ -92,12 +185,34 @@ class Contact:
             >>> data = {"name": "Alice", "phone": "123-456-7890"}
             >>> contact = Contact.from_dict(data)
         """
+        if trusted:
+            return cls.from_fields(data["name"], data["phone"], data.get("email"))
+        
         return cls(
             name=data.get("name", ""),
             phone=data.get("phone", ""),
             email=data.get("email")
         )
     
+    @classmethod
+    def from_fields(cls, name, phone, email=None):
+        """
+        Create a Contact from fields that are already validated and stripped.
+        
+        Skips the checks in __init__. Only use it for data this program
+        wrote itself, such as a storage snapshot.
+        
+        Returns:
+            Contact: A new Contact instance
+        """
+        contact = cls.__new__(cls)
+        contact._name = name
+        contact._phone = phone
+        contact._email = email
+        contact._name_key = contact._email_key = contact._key = None
+        contact._phone_digits = None
+        return contact
+    
     def matches(self, query):
         """
         Check if the contact matches a search query.
@@ -109,12 +224,21 @@ class Contact:
             bool: True if query matches name, phone, or email
         """
         query = query.lower()
-        if query in self.name.lower():
-            return True
-        if query in self.phone:
+        # Reads the cached keys straight from the slots: this runs once per
+        # contact in every search, so it avoids the property calls.
+        name_key = self._name_key
+        if name_key is None:
+            name_key = self.name_key
+        if query in name_key:
             return True
-        if self.email and query in self.email.lower():
+        if query in self._phone:
             return True
+        if self._email:
+            email_key = self._email_key
+            if email_key is None:
+                email_key = self.email_key
+            if query in email_key:
+                return True
         return False
 
 
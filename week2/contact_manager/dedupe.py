@@ -0,0 +1,362 @@
+"""
+Duplicate detection for the Contact Manager 2.0 project.
+
+ContactStorage only treats two contacts as the same when the lower-cased
+names and the exact phone strings are equal (see Contact.key). Imported
+data is messier: "Ann Lee 555-0100" and "LEE, Ann (555) 0100" are the same
+person. Comparing every contact with every other one would take n² / 2
+comparisons (500 billion for a million contacts), so this module only
+compares candidate pairs found in two ways:
+
+- blocking: contacts that share a normalized phone number, the part of
+  the email before the @, or the same set of name words (ignoring order
+  and initials) go into the same block
+- MinHash/LSH: names that share many 2-letter pieces (shingles) are
+  likely to land in the same bucket, which catches misspellings
+
+Blocks and buckets that are very large (a shared office number, a very
+common name) say little about any one pair and are skipped.
+
+Each candidate pair is scored on name similarity, phone and email, and
+pairs above a threshold are joined into clusters with union-find: if A
+matches B and B matches C, all three are one cluster.
+"""
+
+import re
+import unicodedata
+import zlib
+from itertools import combinations
+
+
+WORD = re.compile(r"[a-z0-9]+")
+
+NUM_HASHES = 20       # MinHash signature length
+BAND_ROWS = 4         # Hashes per LSH band (NUM_HASHES / BAND_ROWS bands)
+MAX_BLOCK = 100       # Larger blocks and buckets are skipped
+THRESHOLD = 0.65      # Lowest score that counts as a duplicate
+
+# Score weights: they add up to 1
+NAME_WEIGHT = 0.4
+PHONE_WEIGHT = 0.35
+EMAIL_WEIGHT = 0.25
+
+# (a, b) pairs for the hash functions h(x) = (a * x + b) mod PRIME; fixed,
+# so results are the same on every run
+PRIME = (1 << 61) - 1
+_HASH_PARAMS = [(zlib.crc32(b"a%d" % i) | 1, zlib.crc32(b"b%d" % i)) for i in range(NUM_HASHES)]
+
+
+def name_words(name):
+    """
+    The words of a name, lower-cased and without accents or punctuation.
+    
+    Example:
+        >>> name_words("Lee, Zoë A.")
+        ['lee', 'zoe', 'a']
+    """
+    text = unicodedata.normalize("NFKD", name.lower())
+    return WORD.findall(text.encode("ascii", "ignore").decode("ascii"))
+
+
+def shingles(words):
+    """
+    The 2-letter pieces of some words, with ^ and $ marking their ends.
+    
+    Example:
+        >>> sorted(shingles(["ann"]))
+        ['^a', 'an', 'n$', 'nn']
+    """
+    pieces = set()
+    for word in words:
+        word = f"^{word}$"
+        pieces.update(word[i:i + 2] for i in range(len(word) - 1))
+    return pieces
+
+
+def normalize_phone(phone):
+    """
+    A phone number reduced to its digits, without a leading US country code.
+    
+    Returns:
+        str or None: The digits, or None if there are too few to mean much
+    """
+    digits = re.sub(r"\D", "", phone)
+    if len(digits) == 11 and digits.startswith("1"):
+        digits = digits[1:]
+    return digits if len(digits) >= 7 else None
+
+
+def email_user(email):
+    """
+    The part of an email before the @, lower-cased and without a +tag.
+    
+    Returns:
+        str or None: The user name, or None if there is no usable email
+    """
+    if not email or "@" not in email:
+        return None
+    user = email.lower().split("@", 1)[0].split("+", 1)[0]
+    return user if len(user) >= 3 else None
+
+
+def key_words(name):
+    """
+    The words of a name that tell people apart: order and initials don't
+    matter, so they are sorted and one-letter words are dropped.
+    
+    Example:
+        >>> key_words("Lee, Ann B.")
+        ['ann', 'lee']
+    """
+    return sorted(word for word in name_words(name) if len(word) > 1)
+
+
+class _Features:
+    """The parts of a contact that scoring looks at."""
+    
+    __slots__ = ("shingles", "phone", "email", "email_user")
+    
+    def __init__(self, contact, words):
+        self.shingles = frozenset(shingles(words))
+        self.phone = normalize_phone(contact.phone)
+        self.email = contact.email_key
+        self.email_user = email_user(contact.email)
+
+
+class DuplicateFinder:
+    """
+    Finds clusters of contacts that are probably the same person.
+    
+    Attributes:
+        threshold (float): Lowest score that counts as a duplicate
+        max_block (int): Blocks larger than this are skipped
+        stats (dict): Counts from the last run (blocks, candidate pairs
+            scored, duplicate pairs, clusters)
+    
+    Example:
+        >>> finder = DuplicateFinder()
+        >>> for cluster in finder.clusters(storage.get_all()):
+        ...     print(cluster)
+    """
+    
+    def __init__(self, threshold=THRESHOLD, max_block=MAX_BLOCK):
+        """
+        Initialize the finder.
+        
+        Args:
+            threshold (float): Lowest score that counts as a duplicate
+            max_block (int): Blocks larger than this are skipped
+        """
+        self.threshold = threshold
+        self.max_block = max_block
+        self.stats = {}
+        # Words repeat a lot across names, so their work is done once each
+        self._signatures = {}  # word -> MinHash signature
+        self._shingle_hashes = {}  # shingle -> its NUM_HASHES hash values
+    
+    def _signature(self, words):
+        """MinHash signature of the shingles of some words."""
+        signatures = []
+        for word in words:
+            signature = self._signatures.get(word)
+            if signature is None:
+                hashes = []
+                for piece in shingles([word]):
+                    values = self._shingle_hashes.get(piece)
+                    if values is None:
+                        x = zlib.crc32(piece.encode("utf-8"))
+                        values = self._shingle_hashes[piece] = tuple(
+                            (a * x + b) % PRIME for a, b in _HASH_PARAMS)
+                    hashes.append(values)
+                # The signature of a set is the smallest value of each hash
+                # (a word always has at least two shingles)
+                signature = self._signatures[word] = tuple(map(min, *hashes))
+            signatures.append(signature)
+        if len(signatures) == 1:
+            return signatures[0]
+        return tuple(map(min, *signatures))
+    
+    def _blocks(self, contacts, features):
+        """
+        Group contact positions that share a blocking key or LSH bucket.
+        
+        Args:
+            contacts (list): The contacts
+            features (list): Gets the _Features of each contact, in order
+        
+        Returns:
+            iterator: Lists of two or more positions
+        """
+        blocks = {}
+        for i, contact in enumerate(contacts):
+            words = key_words(contact.name)
+            feature = _Features(contact, words)
+            features.append(feature)
+            
+            keys = ["w:" + " ".join(words)]
+            if feature.phone:
+                keys.append("p:" + feature.phone)
+            if feature.email_user:
+                keys.append("e:" + feature.email_user)
+            if words:
+                # Names with similar shingles agree on a whole band with
+                # high probability, unrelated names rarely do. A band is
+                # kept as its hash (hashing ints gives the same result in
+                # every run), which takes far less memory than the tuple.
+                signature = self._signature(words)
+                keys.extend(hash((band,) + signature[band:band + BAND_ROWS])
+                            for band in range(0, NUM_HASHES, BAND_ROWS))
+            for key in keys:
+                block = blocks.get(key)
+                if block is None:
+                    blocks[key] = [i]
+                else:
+                    block.append(i)
+        
+        skipped = 0
+        for block in blocks.values():
+            if len(block) > self.max_block:
+                skipped += 1
+            elif len(block) > 1:
+                yield block
+        self.stats["blocks skipped"] = skipped
+    
+    def score(self, a, b):
+        """
+        How likely two contacts' features describe the same person.
+        
+        Returns:
+            float: From 0 (nothing in common) to 1
+        """
+        # Dice coefficient: the share of shingles the names have in common
+        total = len(a.shingles) + len(b.shingles)
+        name = 2 * len(a.shingles & b.shingles) / total if total else 0.0
+        phone = a.phone is not None and a.phone == b.phone
+        # Both need an email, and short user names (None) never match
+        email = (a.email is not None and b.email is not None
+                 and (a.email == b.email
+                      or (a.email_user is not None and a.email_user == b.email_user)))
+        return NAME_WEIGHT * name + PHONE_WEIGHT * phone + EMAIL_WEIGHT * email
+    
+    def features(self, contact):
+        """The _Features of a contact, for score()."""
+        return _Features(contact, key_words(contact.name))
+    
+    def pairs(self, contacts):
+        """
+        Find the pairs of contacts that score at least the threshold.
+        
+        A pair whose contacts are already in one cluster through other
+        pairs is not scored, so not every matching pair is listed; enough
+        are to link every cluster.
+        
+        Args:
+            contacts (list): The contacts to check
+        
+        Returns:
+            list: (i, j, score) tuples, positions in `contacts`, i < j
+        """
+        return self._match(contacts)[0]
+    
+    def _match(self, contacts):
+        """
+        Score the candidate pairs and join the matches.
+        
+        Returns:
+            tuple: (pairs as returned by pairs(), root), where root(i) gives
+                the same position for every member of a cluster
+        """
+        features = []
+        
+        # Union-find over positions, so a pair already in one cluster isn't
+        # scored again when it turns up in another block
+        parent = list(range(len(contacts)))
+        
+        def root(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        
+        found = []
+        scored = blocks = 0
+        for block in self._blocks(contacts, features):
+            blocks += 1
+            for i, j in combinations(block, 2):
+                root_i, root_j = root(i), root(j)
+                if root_i == root_j:
+                    continue
+                scored += 1
+                score = self.score(features[i], features[j])
+                if score >= self.threshold:
+                    parent[root_j] = root_i
+                    found.append((min(i, j), max(i, j), score))
+        
+        self.stats.update(blocks=blocks, scored=scored, duplicates=len(found))
+        return found, root
+    
+    def clusters(self, contacts):
+        """
+        Group contacts that are probably the same person.
+        
+        Args:
+            contacts (list): The contacts to check
+        
+        Returns:
+            list: Clusters, each a list of two or more positions in
+                `contacts` in increasing order; clusters are ordered by
+                their first position
+        """
+        root = self._match(contacts)[1]
+        groups = {}
+        for i in range(len(contacts)):
+            groups.setdefault(root(i), []).append(i)
+        clusters = sorted(group for group in groups.values() if len(group) > 1)
+        self.stats["clusters"] = len(clusters)
+        return clusters
+
+
+def find_duplicates(contacts, threshold=THRESHOLD):
+    """
+    Group contacts that are probably the same person.
+    
+    Args:
+        contacts (list): The contacts to check
+        threshold (float): Lowest score that counts as a duplicate
+    
+    Returns:
+        list: Clusters of Contact objects, in the order of `contacts`
+    """
+    finder = DuplicateFinder(threshold)
+    return [[contacts[i] for i in cluster] for cluster in finder.clusters(contacts)]
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    from contact import Contact
+    
+    contacts = [
+        Contact("Ann Lee", "555-123-4567", "ann.lee@example.com"),
+        Contact("LEE, Ann", "(555) 123 4567"),
+        Contact("Ann B. Lee", "+1 555 123 4567", "Ann.Lee+work@example.com"),
+        Contact("Anne Lea", "555-123-4567"),
+        Contact("Bob Stone", "555-987-6543", "bob@example.com"),
+        Contact("Rob Stone", "555-000-1111"),
+    ]
+    print("Testing find_duplicates...")
+    for cluster in find_duplicates(contacts):
+        print("  Same person:")
+        for contact in cluster:
+            print(f"    - {contact}")
+    
+    print("\nTesting that score() doesn't depend on the order...")
+    finder = DuplicateFinder()
+    jo = Contact("Jo Hansen", "555-222-3333", "jo@example.com")
+    maria = Contact("Maria Hansen", "555-222-3333")
+    for a, b in [(jo, maria), *zip(contacts, contacts[1:])]:
+        forward = finder.score(finder.features(a), finder.features(b))
+        backward = finder.score(finder.features(b), finder.features(a))
+        assert forward == backward, (a, b, forward, backward)
+    score = finder.score(finder.features(jo), finder.features(maria))
+    print(f"  {jo.name} vs {maria.name}: {score:.3f} both ways, not duplicates")
+    assert find_duplicates([jo, maria]) == find_duplicates([maria, jo]) == []
@@ -0,0 +1,249 @@
+"""
+File formats module for the Contact Manager 2.0 project.
+
+Reads contacts from the file formats people usually have them in:
+
+- CSV, with the Name, Phone and Email columns that "Export to CSV" writes
+  (in any order, any case; other columns are ignored)
+- JSON, an array of {"name", "phone", "email"} objects like contacts.json
+- vCard (.vcf), as exported by phones and address books: FN (or N), the
+  first TEL and the first EMAIL of each card
+
+Every reader streams its file, so it never has to fit in memory, and yields
+the records as read: (where, record) pairs, where `where` says where the
+record came from (for error messages) and `record` is a dict with name,
+phone and email. Nothing is checked yet, so bad records can be reported
+instead of silently dropped: to_contacts() does the checks, a chunk at a
+time, for ContactStorage.import_file().
+"""
+
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+from contact import Contact
+from streaming import ContactReader
+
+
+CSV_COLUMNS = ["Name", "Phone", "Email"]
+REJECT_COLUMNS = ["Where", "Reason", "Record"]
+
+
+def read_csv(path):
+    """
+    Yield the records of a CSV file with a Name/Phone/Email header.
+    
+    Args:
+        path (str): Path to the CSV file
+    
+    Returns:
+        iterator: (where, record) pairs
+    
+    Raises:
+        ValueError: If the header has no Name or no Phone column
+    """
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        rows = csv.reader(file)
+        header = [column.strip().lower() for column in next(rows, [])]
+        if "name" not in header or "phone" not in header:
+            raise ValueError(f"{path} has no Name and Phone columns")
+        name_at, phone_at = header.index("name"), header.index("phone")
+        email_at = header.index("email") if "email" in header else None
+        
+        for row in rows:
+            if not any(row):
+                continue  # Blank line
+            record = {
+                "name": row[name_at] if name_at < len(row) else "",
+                "phone": row[phone_at] if phone_at < len(row) else "",
+                "email": row[email_at] if email_at is not None and email_at < len(row) else "",
+            }
+            yield f"line {rows.line_num}", record
+
+
+def read_json(path):
+    """
+    Yield the records of a JSON array file.
+    
+    Args:
+        path (str): Path to the JSON file
+    
+    Returns:
+        iterator: (where, record) pairs; a record that isn't a JSON object
+            is passed on as it is, to be rejected
+    
+    Raises:
+        ValueError: If the file isn't a JSON array or is damaged (after the
+            records before the damage were yielded)
+    """
+    reader = ContactReader(path)
+    for number, value in enumerate(reader.values(), 1):
+        yield f"record {number}", value
+    if reader.error:
+        raise ValueError(f"{path}: {reader.error}")
+
+
+def _unescape(value):
+    """Undo vCard escaping (\\n, \\, and \\;)."""
+    if "\\" not in value:
+        return value
+    out = []
+    characters = iter(value)
+    for character in characters:
+        if character == "\\":
+            character = next(characters, "")
+            if character in ("n", "N"):
+                character = "\n"
+        out.append(character)
+    return "".join(out)
+
+
+def _unfolded(file):
+    """
+    Yield (line number, line) for the logical lines of a vCard file.
+    
+    Long vCard lines are folded: continued on the next line, which starts
+    with a space or tab.
+    """
+    start, line = 0, None
+    for number, raw in enumerate(file, 1):
+        raw = raw.rstrip("\r\n")
+        if raw[:1] in (" ", "\t") and line is not None:
+            line += raw[1:]
+            continue
+        if line is not None:
+            yield start, line
+        start, line = number, raw
+    if line is not None:
+        yield start, line
+
+
+def read_vcard(path):
+    """
+    Yield the records of a vCard file (one per BEGIN:VCARD ... END:VCARD).
+    
+    Args:
+        path (str): Path to the .vcf file
+    
+    Returns:
+        iterator: (where, record) pairs
+    """
+    with open(path, encoding="utf-8-sig", errors="replace", newline="") as file:
+        card = None
+        for number, line in _unfolded(file):
+            upper = line.upper()
+            if upper == "BEGIN:VCARD":
+                card, start, parts = {}, number, None
+            elif upper == "END:VCARD":
+                if card is not None:
+                    if "name" not in card and parts:
+                        # No FN: build the name from N (family;given;...)
+                        card["name"] = " ".join(p for p in (parts[1:2] + parts[:1]) if p)
+                    yield f"line {start}", card
+                card = None
+            elif card is not None and ":" in line:
+                prop, value = line.split(":", 1)
+                # "item1.TEL;TYPE=CELL" -> "TEL"
+                prop = prop.split(";", 1)[0].rsplit(".", 1)[-1].upper()
+                if prop == "FN":
+                    card.setdefault("name", _unescape(value))
+                elif prop == "N":
+                    parts = [_unescape(p).strip() for p in value.split(";")]
+                elif prop == "TEL":
+                    card.setdefault("phone", _unescape(value))
+                elif prop == "EMAIL":
+                    card.setdefault("email", _unescape(value))
+
+
+READERS = {".csv": read_csv, ".json": read_json, ".vcf": read_vcard, ".vcard": read_vcard}
+
+
+def read_records(path):
+    """
+    Yield the records of a contacts file, picking the reader by extension.
+    
+    Args:
+        path (str): A .csv, .json, .vcf or .vcard file
+    
+    Returns:
+        iterator: (where, record) pairs
+    
+    Raises:
+        ValueError: If the extension isn't one of these
+    """
+    reader = READERS.get(Path(path).suffix.lower())
+    if reader is None:
+        raise ValueError(f"Don't know how to read {path} "
+                         f"(supported: {', '.join(sorted(READERS))})")
+    return reader(path)
+
+
+def chunks(iterable, size):
+    """Yield lists of up to `size` items from an iterable."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def to_contacts(chunk, rejects):
+    """
+    Check a chunk of records and turn the valid ones into Contacts.
+    
+    Args:
+        chunk (list): (where, record) pairs from a reader
+        rejects (list): Gets a (where, reason, record) tuple for each
+            record that isn't a valid contact
+    
+    Returns:
+        list: The Contacts, in order
+    """
+    contacts = []
+    for where, record in chunk:
+        try:
+            contacts.append(Contact.from_dict(record))
+        except ValueError as e:
+            rejects.append((where, str(e), record))
+        except (AttributeError, TypeError):
+            rejects.append((where, "Not a contact record", record))
+    return contacts
+
+
+def rejects_path(path):
+    """Where rejected records from a file go: people.csv -> people.rejects.csv."""
+    return Path(path).with_suffix(".rejects.csv")
+
+
+def write_rejects(path, rejects):
+    """
+    Write rejected records to a CSV file, with why they were rejected.
+    
+    Args:
+        path (Path): File to write
+        rejects (list): (where, reason, record) tuples; each record is
+            written as JSON so nothing about it is lost
+    """
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(REJECT_COLUMNS)
+        writer.writerows((where, reason, json.dumps(record, ensure_ascii=False))
+                         for where, reason, record in rejects)
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import tempfile
+    
+    print("Testing the readers...")
+    
+    with tempfile.TemporaryDirectory() as folder:
+        folder = Path(folder)
+        (folder / "a.csv").write_text("Name,Phone,Email\nAlice,123-456-7890,\n,555,\n")
+        (folder / "b.vcf").write_text(
+            "BEGIN:VCARD\r\nVERSION:3.0\r\nN:Smith;Bob;;;\r\nTEL;TYPE=CELL:555-1234\r\n"
+            "EMAIL:bob@exam\r\n ple.com\r\nEND:VCARD\r\n"
+        )
+        for name in ("a.csv", "b.vcf"):
+            for where, record in read_records(folder / name):
+                print(f"  {name} {where}: {record}")
+    
+    print("\nTest complete!")
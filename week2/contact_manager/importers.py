@@ -0,0 +1,345 @@
+"""
+API import module for the Contact Manager 2.0 project.
+
+Importing thousands of contacts one request at a time spends almost all of
+its time waiting for the network. import_users() fetches many pages at once
+instead:
+
+- a pool of threads sends up to `workers` requests at the same time (never
+  more, so the API isn't flooded)
+- all threads share one requests.Session, whose connection pool keeps the
+  connections open between requests (no new TCP/TLS handshake each time)
+- a request that gets 429 (too many requests) or a 5xx error is retried
+  after a growing pause, honouring the server's Retry-After header
+- the contacts are stored with one add_many() call at the end, so the
+  contacts file is saved once
+
+StandInServer is a small local server that answers like randomuser.me, so
+imports can be tried and timed without the internet.
+
+Requires the requests library; available() tells you whether it is
+installed.
+"""
+
+import json
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from contact import Contact
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:  # Optional: only needed to import from an API
+    requests = None
+
+
+RANDOMUSER_URL = "https://randomuser.me/api/"
+PAGE_SIZE = 500       # Users per request (randomuser.me allows up to 5000)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def available():
+    """Check whether the requests library is installed."""
+    return requests is not None
+
+
+def make_session(pool_size):
+    """
+    A requests.Session that keeps up to `pool_size` connections open.
+    
+    Args:
+        pool_size (int): Connections kept per host; should be at least the
+            number of threads using the session, or extra connections are
+            opened and thrown away
+    
+    Returns:
+        requests.Session: The session (close it when done)
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _retry_delay(response, attempt, backoff):
+    """Seconds to wait before retrying: Retry-After if given, else exponential."""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after is not None:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass  # An HTTP date; fall back to our own backoff
+    # Jitter, so threads that failed together don't all retry together
+    return backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+
+
+def fetch_page(session, url, page, page_size=PAGE_SIZE, seed="contacts",
+               retries=4, backoff=0.5, timeout=10):
+    """
+    Fetch one page of users, retrying when the server is busy.
+    
+    Args:
+        session (requests.Session): Session to send the request with
+        url (str): API address
+        page (int): Page number, starting at 1
+        page_size (int): Users per page
+        seed (str): Makes the API return the same users for the same pages
+        retries (int): Retries after a 429/5xx answer or a connection error
+        backoff (float): Seconds before the first retry; doubled each time
+        timeout (float): Seconds to wait for an answer
+    
+    Returns:
+        list: User dicts, in randomuser.me format
+    
+    Raises:
+        requests.exceptions.RequestException: If the page still fails
+            after all retries, or fails with another error
+    """
+    params = {"results": page_size, "page": page, "seed": seed, "inc": "name,phone,email"}
+    for attempt in range(retries + 1):
+        response = None
+        try:
+            response = session.get(url, params=params, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                response.raise_for_status()
+                return response.json()["results"]
+        time.sleep(_retry_delay(response, attempt, backoff))
+
+
+def fetch_users(count, url=RANDOMUSER_URL, workers=8, page_size=PAGE_SIZE, **options):
+    """
+    Fetch users, several pages at a time.
+    
+    Args:
+        count (int): Number of users
+        url (str): API address
+        workers (int): Most requests in flight at once
+        page_size (int): Users per request
+        **options: Passed on to fetch_page() (seed, retries, backoff, timeout)
+    
+    Returns:
+        list: `count` user dicts, in page order
+    
+    Raises:
+        requests.exceptions.RequestException: If a page can't be fetched
+    """
+    if count <= 0:
+        return []
+    # Don't make the API generate a full page for a handful of users
+    page_size = min(page_size, count)
+    pages = math.ceil(count / page_size)
+    session = make_session(workers)
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        # map() runs the pages `workers` at a time and returns them in order
+        results = pool.map(lambda page: fetch_page(session, url, page, page_size, **options),
+                           range(1, pages + 1))
+        users = [user for page in results for user in page]
+    finally:
+        # After a failure, don't start the pages that are still waiting
+        pool.shutdown(cancel_futures=True)
+        session.close()
+    return users[:count]
+
+
+def user_to_contact(user):
+    """
+    Turn a randomuser.me user into a Contact.
+    
+    Args:
+        user (dict): One entry of the API's "results" list
+    
+    Returns:
+        Contact or None: The contact, or None if a field is missing or empty
+    """
+    try:
+        name = f"{user['name']['first']} {user['name']['last']}"
+        return Contact(name, user["phone"], user.get("email"))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def import_users(storage, count, url=RANDOMUSER_URL, workers=8, **options):
+    """
+    Fetch users from the API and add them to a storage in one batch.
+    
+    Args:
+        storage (ContactStorage): Where to add the contacts
+        count (int): Number of users to fetch
+        url (str): API address
+        workers (int): Most requests in flight at once
+        **options: Passed on to fetch_users()
+    
+    Returns:
+        tuple: (users fetched, contacts added); users with missing fields
+            and contacts that already exist are not added
+    
+    Raises:
+        requests.exceptions.RequestException: If a page can't be fetched
+            (nothing is added then)
+    """
+    users = fetch_users(count, url, workers, **options)
+    contacts = [c for c in map(user_to_contact, users) if c is not None]
+    return len(users), storage.add_many(contacts)
+
+
+FIRST_NAMES = ["Ava", "Ben", "Chloe", "Daniel", "Emma", "Felix", "Grace", "Hugo",
+               "Isla", "Jonas", "Kira", "Liam", "Maya", "Noah", "Olivia", "Paul"]
+LAST_NAMES = ["Adams", "Berg", "Costa", "Dubois", "Evans", "Fischer", "Garcia",
+              "Hansen", "Ito", "Jensen", "Klein", "Lopez", "Moreau", "Novak"]
+
+
+def stand_in_user(seed, number):
+    """
+    The `number`-th user a stand-in server returns for a seed.
+    
+    Always the same user for the same arguments, like randomuser.me, and
+    every number gets a different phone, so no two users are duplicates.
+    """
+    rng = random.Random(f"{seed}:{number}")
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    return {
+        "name": {"title": rng.choice(["Mr", "Ms", "Mx"]), "first": first, "last": last},
+        "email": f"{first}.{last}{number}@example.com".lower(),
+        "phone": f"({number // 10_000_000 % 1000:03d}) {number // 10_000 % 1000:03d}-"
+                 f"{number % 10_000:04d}",
+    }
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """Answers GET requests for a StandInServer."""
+    
+    # HTTP/1.1 keeps connections open between requests
+    protocol_version = "HTTP/1.1"
+    
+    def setup(self):
+        """Count the connection, then set up as usual."""
+        self.server.count("connections")
+        super().setup()
+    
+    def do_GET(self):
+        """Send a page of users, or an error now and then."""
+        server = self.server
+        number = server.count("requests")
+        if server.fail_every and number % server.fail_every == 0:
+            self._send(429 if number % (2 * server.fail_every) else 503,
+                       {"error": "Try again"}, {"Retry-After": "0"})
+            return
+        
+        params = parse_qs(urlparse(self.path).query)
+        size = min(int(params.get("results", ["1"])[0]), 5000)
+        page = max(int(params.get("page", ["1"])[0]), 1)
+        seed = params.get("seed", ["contacts"])[0]
+        start = (page - 1) * size
+        users = [stand_in_user(seed, start + i) for i in range(size)]
+        if server.latency:
+            time.sleep(server.latency)
+        self._send(200, {"results": users,
+                         "info": {"seed": seed, "results": size, "page": page, "version": "1.4"}})
+    
+    def _send(self, status, body, headers=()):
+        """Send a JSON response."""
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in dict(headers).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        """Stay quiet (the default prints every request)."""
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    A local stand-in for randomuser.me, running in a background thread.
+    
+    Answers /api/?results=N&page=P&seed=S with N made-up users in the same
+    format. It can be made slow (to behave like a real network) and to fail
+    every few requests (to exercise retries).
+    
+    Attributes:
+        url (str): Address to pass to import_users()
+        latency (float): Seconds each page takes to answer
+        fail_every (int): Answer every n-th request with 429 or 503 (0: never)
+        stats (dict): Number of "connections" and "requests" so far
+    
+    Example:
+        >>> with StandInServer(latency=0.05) as server:
+        ...     import_users(storage, 1000, server.url)
+    """
+    
+    daemon_threads = True
+    
+    def __init__(self, latency=0.0, fail_every=0):
+        """
+        Start the server on a free local port.
+        
+        Args:
+            latency (float): Seconds each page takes to answer
+            fail_every (int): Answer every n-th request with 429 or 503
+        """
+        super().__init__(("127.0.0.1", 0), _StandInHandler)
+        self.latency = latency
+        self.fail_every = fail_every
+        self.stats = {"connections": 0, "requests": 0}
+        self._stats_lock = threading.Lock()
+        self.url = f"http://127.0.0.1:{self.server_address[1]}/api/"
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+    
+    def count(self, what):
+        """Add one to a statistic and return the new value."""
+        with self._stats_lock:
+            self.stats[what] += 1
+            return self.stats[what]
+    
+    def close(self):
+        """Stop the server."""
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+    
+    def __exit__(self, *exc_info):
+        """Stop the server at the end of a with block."""
+        self.close()
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import tempfile
+    from contextlib import redirect_stdout
+    from io import StringIO
+    from pathlib import Path
+    from storage import ContactStorage
+    
+    if not available():
+        raise SystemExit("This needs the requests library: pip install requests")
+    
+    print("Testing import_users against a local stand-in server...")
+    
+    with tempfile.TemporaryDirectory() as folder, \
+            StandInServer(latency=0.05, fail_every=7) as server:
+        storage = ContactStorage(Path(folder) / "test_contacts.json")
+        start = time.perf_counter()
+        with redirect_stdout(StringIO()):
+            fetched, added = import_users(storage, 5000, server.url, workers=8, page_size=250)
+        seconds = time.perf_counter() - start
+        print(f"Fetched {fetched} users, added {added} contacts in {seconds:.2f} s")
+        print(f"Server saw {server.stats['requests']} requests "
+              f"(some answered 429/503 and retried) on {server.stats['connections']} connections")
+        print(f"First contact: {storage.get_all()[0]}")
+    
+    print("\nTest complete! (test file deleted)")
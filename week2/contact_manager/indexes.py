@@ -0,0 +1,539 @@
+"""
+Search indexes for the Contact Manager 2.0 project.
+
+ContactStorage gives every contact a fixed integer id. The indexes here map
+pieces of a contact (like parts of its name) to the ids of the contacts that
+have them, so a search can jump straight to a few candidates instead of
+checking every contact.
+
+Every index has the same methods. ContactStorage calls build() once, the
+first time the index is needed, and then add() and remove() whenever a
+contact is stored, changed or removed:
+- build(items) with (cid, contact) pairs
+- add(cid, contact)
+- remove(cid, contact)
+"""
+
+import math
+import unicodedata
+from bisect import bisect_left, bisect_right, insort
+
+
+def trigrams(text):
+    """
+    Split text into its overlapping 3-character pieces.
+    
+    Example:
+        >>> sorted(trigrams("alice"))
+        ['ali', 'ice', 'lic']
+    """
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Finds candidates for substring searches (see Contact.matches).
+    
+    Indexes the trigrams of the lower-cased name and email and of the phone.
+    If a query is a substring of one of those fields, every trigram of the
+    query is a trigram of the contact, so intersecting the trigrams' id sets
+    gives every contact that could match (and usually only those).
+    """
+    
+    def __init__(self):
+        self._postings = {}  # trigram -> set of ids
+    
+    @staticmethod
+    def _grams(contact):
+        """All trigrams of the fields Contact.matches looks at."""
+        grams = trigrams(contact.name_key) | trigrams(contact.phone)
+        if contact.email_key:
+            grams |= trigrams(contact.email_key)
+        return grams
+    
+    def build(self, items):
+        """Index many (cid, contact) pairs."""
+        for cid, contact in items:
+            self.add(cid, contact)
+    
+    def add(self, cid, contact):
+        """Index a contact."""
+        for gram in self._grams(contact):
+            self._postings.setdefault(gram, set()).add(cid)
+    
+    def remove(self, cid, contact):
+        """Remove a contact from the index."""
+        for gram in self._grams(contact):
+            ids = self._postings[gram]
+            ids.discard(cid)
+            if not ids:
+                del self._postings[gram]
+    
+    def candidates(self, query):
+        """
+        Get the ids of contacts that might match a query.
+        
+        Args:
+            query (str): The search string, as passed to Contact.matches
+        
+        Returns:
+            set or None: Candidate ids to check with Contact.matches, or None
+                if the query is too short (under 3 characters) to use the index
+        """
+        grams = trigrams(query.lower())
+        if not grams:
+            return None
+        
+        postings = []
+        for gram in grams:
+            ids = self._postings.get(gram)
+            if not ids:
+                return set()
+            postings.append(ids)
+        
+        # Start from the rarest trigram so the working set stays small
+        postings.sort(key=len)
+        result = set(postings[0])
+        for ids in postings[1:]:
+            result &= ids
+            if not result:
+                break
+        return result
+    
+    def estimate(self, query):
+        """
+        Guess how many candidates() would return, without intersecting.
+        
+        Returns:
+            int or None: The size of the rarest trigram's id set (at least
+                as many as the candidates), or None if the query is too short
+        """
+        grams = trigrams(query.lower())
+        if not grams:
+            return None
+        return min(len(self._postings.get(gram, ())) for gram in grams)
+
+
+class PrefixIndex:
+    """
+    Finds names that start with some text (for type-ahead suggestions).
+    
+    Keeps a sorted list of (lower-cased name, id) pairs. All names with a
+    given prefix sit next to each other in that list, so binary search
+    (bisect) finds the first one in O(log n) and the rest follow in order.
+    """
+    
+    def __init__(self):
+        self._entries = []  # sorted (name_key, id) pairs
+    
+    def build(self, items):
+        """Index many (cid, contact) pairs, sorting once at the end."""
+        self._entries.extend((contact.name_key, cid) for cid, contact in items)
+        self._entries.sort()
+    
+    def add(self, cid, contact):
+        """Index a contact."""
+        insort(self._entries, (contact.name_key, cid))
+    
+    def remove(self, cid, contact):
+        """Remove a contact from the index."""
+        i = bisect_left(self._entries, (contact.name_key, cid))
+        del self._entries[i]
+    
+    def complete(self, prefix, limit=10):
+        """
+        Get contacts whose name starts with `prefix` (ignoring case).
+        
+        Args:
+            prefix (str): The start of a name
+            limit (int): Maximum number of results
+        
+        Returns:
+            list: Ids in alphabetical order of name, one per distinct name
+                (the first contact stored under that name)
+        """
+        entries = self._entries
+        prefix = prefix.lower()
+        result = []
+        i = bisect_left(entries, (prefix,))
+        while i < len(entries) and len(result) < limit:
+            key, cid = entries[i]
+            if not key.startswith(prefix):
+                break
+            result.append(cid)
+            # Skip the other contacts with this same name
+            i = bisect_right(entries, (key, math.inf), i)
+        return result
+    
+    def _range(self, prefix):
+        """Where the entries starting with `prefix` begin and end."""
+        prefix = prefix.lower()
+        start = bisect_left(self._entries, (prefix,))
+        # Every name starting with the prefix sorts before prefix + the
+        # highest character
+        return start, bisect_left(self._entries, (prefix + "\U0010ffff",), start)
+    
+    def count(self, prefix):
+        """Count the contacts whose name starts with `prefix`, in O(log n)."""
+        start, stop = self._range(prefix)
+        return stop - start
+    
+    def starting_with(self, prefix):
+        """
+        Get every contact whose name starts with `prefix` (ignoring case).
+        
+        Returns:
+            list: Ids in alphabetical order of name
+        """
+        start, stop = self._range(prefix)
+        return [cid for _, cid in self._entries[start:stop]]
+
+
+class PhoneIndex:
+    """
+    Finds contacts by phone number, whatever way the number is written.
+    
+    Works on Contact.phone_digits, so "123-456-7890", "(123) 456 7890" and
+    "1234567890" are all the same number. Two lookups are supported:
+    - exact number: a dict from digits to ids, O(1)
+    - last N digits (caller-ID style): a sorted list of the digits written
+      backwards, so "ends with 7890" becomes "starts with 0987" and is found
+      with binary search, O(log n)
+    """
+    
+    def __init__(self):
+        self._by_digits = {}  # digits -> set of ids
+        self._reversed = []   # sorted (reversed digits, id) pairs
+    
+    def build(self, items):
+        """Index many (cid, contact) pairs, sorting once at the end."""
+        for cid, contact in items:
+            digits = contact.phone_digits
+            if digits:
+                self._by_digits.setdefault(digits, set()).add(cid)
+                self._reversed.append((digits[::-1], cid))
+        self._reversed.sort()
+    
+    def add(self, cid, contact):
+        """Index a contact."""
+        digits = contact.phone_digits
+        if digits:
+            self._by_digits.setdefault(digits, set()).add(cid)
+            insort(self._reversed, (digits[::-1], cid))
+    
+    def remove(self, cid, contact):
+        """Remove a contact from the index."""
+        digits = contact.phone_digits
+        if digits:
+            ids = self._by_digits[digits]
+            ids.discard(cid)
+            if not ids:
+                del self._by_digits[digits]
+            del self._reversed[bisect_left(self._reversed, (digits[::-1], cid))]
+    
+    def lookup(self, digits):
+        """
+        Get the ids of contacts whose phone has exactly these digits.
+        
+        Returns:
+            set: Matching ids (empty if none)
+        """
+        return self._by_digits.get(digits, set())
+    
+    def count_ending_with(self, digits):
+        """Count the contacts whose phone digits end with `digits`, in O(log n)."""
+        backwards = digits[::-1]
+        start = bisect_left(self._reversed, (backwards,))
+        # ":" comes right after "9", so it is past every number we want
+        return bisect_left(self._reversed, (backwards + ":",), start) - start
+    
+    def ending_with(self, digits, limit=None):
+        """
+        Get the ids of contacts whose phone digits end with `digits`.
+        
+        Args:
+            digits (str): The last digits of the number
+            limit (int, optional): Stop after this many matches
+        
+        Returns:
+            list: Matching ids (in order of the reversed number)
+        """
+        entries = self._reversed
+        backwards = digits[::-1]
+        result = []
+        i = bisect_left(entries, (backwards,))
+        while i < len(entries) and entries[i][0].startswith(backwards):
+            if limit is not None and len(result) >= limit:
+                break
+            result.append(entries[i][1])
+            i += 1
+        return result
+
+
+class EmailDomainIndex:
+    """
+    Finds contacts by the domain of their email ("example.com").
+    
+    A dict from the lower-cased part after the @ to the contacts that have
+    it, so "everyone at example.com" is one lookup.
+    """
+    
+    def __init__(self):
+        self._by_domain = {}  # domain -> set of ids
+    
+    @staticmethod
+    def domain(email):
+        """The lower-cased part of an email after the last @, or None."""
+        if not email or "@" not in email:
+            return None
+        return email.lower().rsplit("@", 1)[1]
+    
+    def build(self, items):
+        """Index many (cid, contact) pairs."""
+        for cid, contact in items:
+            self.add(cid, contact)
+    
+    def add(self, cid, contact):
+        """Index a contact."""
+        domain = self.domain(contact.email_key)
+        if domain is not None:
+            self._by_domain.setdefault(domain, set()).add(cid)
+    
+    def remove(self, cid, contact):
+        """Remove a contact from the index."""
+        domain = self.domain(contact.email_key)
+        if domain is not None:
+            ids = self._by_domain[domain]
+            ids.discard(cid)
+            if not ids:
+                del self._by_domain[domain]
+    
+    def lookup(self, domain):
+        """
+        Get the ids of contacts with an email at `domain`.
+        
+        Returns:
+            set: Matching ids (empty if none)
+        """
+        return self._by_domain.get(domain.lower(), set())
+
+
+def edit_distance(a, b):
+    """
+    Levenshtein distance: the fewest single-character insertions, deletions
+    and substitutions that turn `a` into `b`.
+    
+    Example:
+        >>> edit_distance("jhon", "john")
+        2
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1,               # delete
+                               current[j - 1] + 1,            # insert
+                               previous[j - 1] + (ca != cb)))  # substitute
+        previous = current
+    return previous[-1]
+
+
+class FuzzyNameIndex:
+    """
+    Finds names that are spelled almost like a query ("Jhon" -> "John").
+    
+    The lower-cased words of every name go into a BK-tree. Each node's
+    children are grouped by their edit distance to the node, and because
+    edit distance obeys the triangle inequality, a search for words within
+    distance k of a query only has to visit the children whose group number
+    is within k of the query's distance to the node. Most of the tree is
+    never looked at.
+    
+    Many contacts share words (first names especially), so the tree holds
+    one node per distinct word and a dict maps each word to its contacts.
+    """
+    
+    def __init__(self):
+        self._root = None    # [word, {distance: child node}]
+        self._ids = {}       # word -> set of ids
+    
+    @staticmethod
+    def _words(contact):
+        return set(contact.name_key.split())
+    
+    def build(self, items):
+        """Index many (cid, contact) pairs."""
+        for cid, contact in items:
+            self.add(cid, contact)
+    
+    def _insert(self, word):
+        """Put a word into the BK-tree."""
+        if self._root is None:
+            self._root = [word, {}]
+            return
+        node = self._root
+        while True:
+            distance = edit_distance(word, node[0])
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [word, {}]
+                return
+            node = child
+    
+    def add(self, cid, contact):
+        """Index a contact."""
+        for word in self._words(contact):
+            ids = self._ids.get(word)
+            if ids is None:
+                # Words stay in the tree once added; a word whose contacts
+                # are all gone just has an empty id set.
+                ids = self._ids[word] = set()
+                self._insert(word)
+            ids.add(cid)
+    
+    def remove(self, cid, contact):
+        """Remove a contact from the index."""
+        for word in self._words(contact):
+            self._ids[word].discard(cid)
+    
+    def search(self, word, max_distance):
+        """
+        Find indexed words close to `word`.
+        
+        Returns:
+            list: (distance, word) pairs for words that still have contacts
+        """
+        found = []
+        stack = [self._root] if self._root else []
+        while stack:
+            node_word, children = stack.pop()
+            distance = edit_distance(word, node_word)
+            if distance <= max_distance and self._ids[node_word]:
+                found.append((distance, node_word))
+            for gap in range(distance - max_distance, distance + max_distance + 1):
+                child = children.get(gap)
+                if child is not None:
+                    stack.append(child)
+        return found
+    
+    def lookup(self, query, max_distance=2):
+        """
+        Find contacts whose name is close to the query, word by word.
+        
+        Every word of the query has to be within `max_distance` of some
+        word of the name; the name's score is the sum of those distances.
+        
+        Args:
+            query (str): One or more words
+            max_distance (int): Most edits allowed per word
+        
+        Returns:
+            dict: id -> total distance
+        """
+        scores = None
+        for word in query.lower().split():
+            best = {}
+            for distance, match in self.search(word, max_distance):
+                for cid in self._ids[match]:
+                    if distance < best.get(cid, max_distance + 1):
+                        best[cid] = distance
+            if scores is None:
+                scores = best
+            else:
+                scores = {cid: scores[cid] + d for cid, d in best.items() if cid in scores}
+            if not scores:
+                break
+        return scores or {}
+
+
+SOUNDEX_DIGITS = {letter: digit
+                  for letters, digit in (("bfpv", "1"), ("cgjkqsxz", "2"), ("dt", "3"),
+                                         ("l", "4"), ("mn", "5"), ("r", "6"))
+                  for letter in letters}
+
+
+def soundex(word):
+    """
+    The Soundex code of a word: its first letter plus three digits for
+    the consonant sounds that follow, so names that sound alike share a code.
+    
+    Accents are dropped first ("Zoë" is coded like "Zoe").
+    
+    Example:
+        >>> soundex("Robert"), soundex("Rupert")
+        ('R163', 'R163')
+    
+    Returns:
+        str or None: The code, or None if the word has no letters a-z
+    """
+    letters = [c for c in unicodedata.normalize("NFKD", word.lower()) if "a" <= c <= "z"]
+    if not letters:
+        return None
+    
+    code = letters[0].upper()
+    last = SOUNDEX_DIGITS.get(letters[0], "")
+    for letter in letters[1:]:
+        digit = SOUNDEX_DIGITS.get(letter)
+        if digit:
+            if digit != last:
+                code += digit
+                if len(code) == 4:
+                    break
+            last = digit
+        elif letter not in "hw":
+            # A vowel between two equal sounds means both are written down;
+            # h and w don't separate them.
+            last = ""
+    return code.ljust(4, "0")
+
+
+class PhoneticIndex:
+    """
+    Finds names that sound like a query ("Signy Anderson" -> "Signe Andersen").
+    
+    Each word of each name is reduced to its Soundex code when the contact
+    is indexed, and a dict maps every code to the contacts that have it. A
+    lookup costs as much as the buckets it touches, not the whole store.
+    """
+    
+    def __init__(self):
+        self._by_code = {}  # Soundex code -> set of ids
+    
+    @staticmethod
+    def codes(text):
+        """The set of Soundex codes of the words in some text."""
+        return {code for code in map(soundex, text.split()) if code}
+    
+    def build(self, items):
+        """Index many (cid, contact) pairs."""
+        for cid, contact in items:
+            self.add(cid, contact)
+    
+    def add(self, cid, contact):
+        """Index a contact."""
+        for code in self.codes(contact.name):
+            self._by_code.setdefault(code, set()).add(cid)
+    
+    def remove(self, cid, contact):
+        """Remove a contact from the index."""
+        for code in self.codes(contact.name):
+            ids = self._by_code[code]
+            ids.discard(cid)
+            if not ids:
+                del self._by_code[code]
+    
+    def lookup(self, name):
+        """
+        Get the ids of contacts with a sound-alike word for every word of
+        `name`.
+        
+        Returns:
+            set: Matching ids
+        """
+        buckets = [self._by_code.get(code, set()) for code in self.codes(name)]
+        if not buckets:
+            return set()
+        buckets.sort(key=len)
+        return set(buckets[0]).intersection(*buckets[1:])
@@ -0,0 +1,308 @@
+"""
+Journal module for the Contact Manager 2.0 project.
+
+Instead of rewriting the whole contacts file after every change, a journaled
+ContactStorage appends one small record per change to a log file that sits
+next to the JSON file (contacts.json -> contacts.json.log). Loading reads the
+JSON snapshot and then replays the log on top of it.
+
+Each line of the log looks like this:
+    
+    <crc32 as 8 hex digits> <compact JSON record>\\n
+
+The first record is a header that names the snapshot the log belongs to:
+its inode, size and modification time, and a hash of its contents. Copying
+the data folder (cp -r, a backup restore, rsync) changes the first three
+but not the hash, so the log still applies. If the snapshot's contents were
+replaced, the old log no longer matches and is never replayed, so a crash
+between writing a new snapshot and starting a new log never replays changes
+twice. A log that doesn't match is moved aside (with a warning), never
+deleted, in case its changes are still wanted.
+
+A record that was only half written when the process crashed fails its
+checksum (or has no newline) and is skipped, together with anything after it.
+"""
+
+import hashlib
+import json
+import os
+import time
+import zlib
+from pathlib import Path
+
+
+def file_stamp(path):
+    """
+    Identify the current version of a file.
+    
+    Args:
+        path (Path): File to look at
+    
+    Returns:
+        list or None: [inode, size, mtime_ns], or None if the file is missing
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+def file_hash(path):
+    """
+    Hash a file's contents.
+    
+    Args:
+        path (Path): File to hash
+    
+    Returns:
+        bytes: 16-byte BLAKE2b digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        while chunk := file.read(1 << 20):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def content_hash(path, data=None):
+    """
+    Identify a file by its contents, for a log header.
+    
+    Args:
+        path (Path): The file
+        data (bytes, optional): Its contents, if already in memory
+    
+    Returns:
+        str or None: Hex digest, or None if the file is missing
+    """
+    if data is not None:
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+    try:
+        return file_hash(path).hex()
+    except FileNotFoundError:
+        return None
+
+
+def atomic_write(path, data, fsync=True):
+    """
+    Replace a file's contents without ever leaving it half written.
+    
+    The data goes to a temporary file in the same directory, which is flushed
+    to disk and then renamed over the target.
+    
+    Args:
+        path (Path): File to write
+        data (bytes): New contents
+        fsync (bool): Wait until the data is on disk. Can be turned off for
+            files that can be rebuilt, such as caches.
+    """
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as file:
+            file.write(data)
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    if not fsync:
+        return
+    
+    # Make the rename itself durable (not supported on every platform)
+    try:
+        fd = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def encode_record(record):
+    """Turn a record into one checksummed log line (bytes)."""
+    payload = json.dumps(record, separators=(",", ":"), ensure_ascii=False)
+    payload = payload.encode("utf-8")
+    return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+
+def decode_record(line):
+    """
+    Parse one log line.
+    
+    Returns:
+        dict or None: The record, or None if the line is torn or corrupted
+    """
+    if not line.endswith(b"\n") or len(line) < 10 or line[8:9] != b" ":
+        return None
+    payload = line[9:-1]
+    try:
+        if int(line[:8], 16) != zlib.crc32(payload):
+            return None
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+
+class Journal:
+    """
+    An append-only log of changes made to a ContactStorage.
+    
+    Attributes:
+        path (Path): Path to the log file
+        size (int): Current size of the log in bytes
+        records (int): Number of change records in the log (header excluded)
+        fsync (bool): Force every append to disk before returning
+    """
+    
+    def __init__(self, path, fsync=True):
+        """
+        Initialize the journal.
+        
+        Args:
+            path (str): Path to the log file
+            fsync (bool): Force every append to disk before returning
+        """
+        self.path = Path(path)
+        self.fsync = fsync
+        self.size = 0
+        self.records = 0
+    
+    def read(self, stamp, digest):
+        """
+        Read the change records that belong to a snapshot.
+        
+        A torn or corrupted record ends the replay. The log is cut back to
+        the last good record so new appends start on a clean line.
+        
+        A log written against another snapshot is moved aside (see
+        set_aside), so reset() can't overwrite it.
+        
+        Args:
+            stamp (list or None): file_stamp() of the snapshot
+            digest (callable): Returns content_hash() of the snapshot; only
+                called when the stamp doesn't match (the file was copied)
+        
+        Returns:
+            list or None: The records, or None if there is no log for this
+                snapshot (missing, or written against another snapshot)
+        """
+        try:
+            with open(self.path, "rb") as file:
+                lines = file.readlines()
+        except FileNotFoundError:
+            return None
+        if not lines:
+            return None
+        
+        header = decode_record(lines[0])
+        if (not header or header.get("op") != "base"
+                or (header.get("stamp") != stamp
+                    and (header.get("hash") is None or header["hash"] != digest()))):
+            self.set_aside()
+            return None
+        
+        self.records = 0
+        return self._decode(lines[1:], len(lines[0]))
+    
+    def set_aside(self):
+        """
+        Rename a log that doesn't belong to the current snapshot, and warn.
+        
+        Its changes are not applied, but they aren't lost either.
+        
+        Returns:
+            Path: Where the log is now
+        """
+        aside = self.path.with_name(f"{self.path.name}.{time.strftime('%Y%m%d-%H%M%S')}.orphan")
+        os.replace(self.path, aside)
+        print(f"Warning: {self.path} was written for another version of the contacts "
+              f"file, so its changes were not applied. It was moved to {aside}.")
+        return aside
+    
+    def read_tail(self, offset):
+        """
+        Read the records appended after a position, e.g. by another process.
+        
+        Like read(), stops at a torn or corrupted record and cuts it off.
+        
+        Args:
+            offset (int): Where the records already read end (self.size)
+        
+        Returns:
+            list: The new records
+        """
+        with open(self.path, "rb") as file:
+            file.seek(offset)
+            lines = file.readlines()
+        return self._decode(lines, offset)
+    
+    def _decode(self, lines, start):
+        """
+        Decode log lines that begin at byte `start` of the log.
+        
+        Returns:
+            list: The records up to the first bad line
+        """
+        records = []
+        good = start
+        for line in lines:
+            record = decode_record(line)
+            if record is None:
+                break
+            records.append(record)
+            good += len(line)
+        
+        total = start + sum(len(line) for line in lines)
+        if good < total:
+            print(f"Warning: skipped a damaged record at the end of {self.path}")
+            with open(self.path, "r+b") as file:
+                file.truncate(good)
+        
+        self.size = good
+        self.records += len(records)
+        return records
+    
+    def reset(self, stamp, digest, keep_from=None):
+        """
+        Start a new log for a snapshot.
+        
+        Args:
+            stamp (list or None): file_stamp() of the snapshot
+            digest (str or None): content_hash() of the snapshot
+            keep_from (int, optional): Carry the records after this position
+                (an earlier self.size) over to the new log: the ones
+                appended while the snapshot was being written, which it
+                doesn't contain
+        """
+        header = encode_record({"op": "base", "stamp": stamp, "hash": digest})
+        kept = b""
+        if keep_from is not None and keep_from < self.size:
+            with open(self.path, "rb") as file:
+                file.seek(keep_from)
+                kept = file.read(self.size - keep_from)
+        atomic_write(self.path, header + kept)
+        self.size = len(header) + len(kept)
+        self.records = kept.count(b"\n")
+    
+    def append(self, records):
+        """
+        Append change records to the log.
+        
+        Args:
+            records (list): JSON-serializable dicts, written in order
+        """
+        data = b"".join(encode_record(r) for r in records)
+        with open(self.path, "ab") as file:
+            file.write(data)
+            file.flush()
+            if self.fsync:
+                os.fsync(file.fileno())
+        self.size += len(data)
+        self.records += len(records)
@@ -0,0 +1,87 @@
+"""
+File locking module for the Contact Manager 2.0 project.
+
+When several programs use the same contacts.json at once, each one keeps
+its own copy of the contacts in memory. Without coordination, two programs
+that save at about the same time overwrite each other's changes.
+
+FileLock takes an exclusive lock on a small lock file next to the contacts
+(contacts.json -> contacts.json.lock), using the operating system's
+advisory locks (fcntl.flock). Only one program holds the lock at a time, so
+"read the latest version, change it, write it back" happens as one step.
+
+fcntl is not available on Windows; available() tells you whether this
+module can be used.
+"""
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+
+def available():
+    """Check whether file locking is supported on this platform."""
+    return fcntl is not None
+
+
+class FileLock:
+    """
+    An exclusive lock shared between processes.
+    
+    Re-entrant within one process: acquiring a lock you already hold just
+    counts, and it is released when the outermost holder releases it. It is
+    not meant to be shared between threads (ContactStorage guards it with
+    its own thread lock).
+    
+    Attributes:
+        path (Path): The lock file (created if missing, never deleted)
+    
+    Example:
+        >>> with FileLock("contacts.json.lock"):
+        ...     pass  # no other process holds the lock here
+    """
+    
+    def __init__(self, path):
+        """
+        Initialize the lock (nothing is locked yet).
+        
+        Args:
+            path (Path): Path to the lock file
+        """
+        self.path = path
+        self._file = None
+        self._depth = 0
+    
+    @property
+    def held(self):
+        """True while this process holds the lock."""
+        return self._depth > 0
+    
+    def acquire(self):
+        """Wait until the lock is free, then take it."""
+        if self._depth == 0:
+            if self._file is None:
+                self._file = open(self.path, "a+b")
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        self._depth += 1
+    
+    def release(self):
+        """Give the lock back."""
+        self._depth -= 1
+        if self._depth == 0:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+    
+    def close(self):
+        """Close the lock file (releasing the lock if it is held)."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._depth = 0
+    
+    def __enter__(self):
+        self.acquire()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.release()
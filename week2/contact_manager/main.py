@@ -9,21 +9,44 @@ A CLI-based contact manager demonstrating:
 - Error Handling
 
 Usage:
-    python main.py
+    python main.py [FILE] [--backend json|sqlite|mapped] [--journal | --write-behind]
+                   [--shared] [--api-url URL]
+    python main.py [FILE] --export CSV [--compress gzip|bz2|lzma] [--shards N]
+    
+    FILE defaults to contacts.json. Files ending in .db, .sqlite or .sqlite3
+    use the SQLite backend; a new database is filled from contacts.json
+    (next to it) the first time it is opened. Files ending in .cmap are
+    read-only memory-mapped files, built from contacts.json the same way.
 
 Commands:
     add     - Add a new contact
     list    - List all contacts
-    search  - Search for contacts
+    search  - Search for contacts (plain text, or a query: see query.py)
     edit    - Edit a contact
     delete  - Remove a contact
     import  - Import sample contacts from API
     export  - Export contacts to CSV
+    load    - Import contacts from a CSV, JSON or vCard file
     quit    - Exit the program
 """
 
+import argparse
+from pathlib import Path
+import exporters
+import formats
+import importers
 from contact import Contact
 from storage import ContactStorage
+from sqlite_storage import SQLiteContactStorage
+from mapped_storage import MappedContactStorage, write_mapped
+from query import looks_like_query
+from streaming import ContactReader
+
+
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+MAPPED_EXTENSIONS = (".cmap",)
+# Menu choices that change the contacts
+CHANGES = {"1", "4", "5", "6", "8"}
 
 
 def print_menu():
@@ -38,10 +61,20 @@ def print_menu():
     print("  5. Delete contact")
     print("  6. Import from API")
     print("  7. Export to CSV")
+    print("  8. Import from file")
     print("  0. Quit")
     print("=" * 40)
 
 
+def print_suggestions(storage, name):
+    """Show names that share the longest possible start with what was typed."""
+    for length in range(len(name), 0, -1):
+        suggestions = storage.complete(name[:length], limit=5)
+        if suggestions:
+            print(f"   Did you mean: {', '.join(suggestions)}?")
+            return
+
+
 def add_contact(storage):
     """Add a new contact."""
     print("\n--- Add New Contact ---")
@@ -87,16 +120,32 @@ def search_contacts(storage):
     """Search for contacts."""
     print("\n--- Search Contacts ---")
     
-    query = input("Search term: ").strip()
+    query = input("Search term (or a query like name:smith AND NOT email:): ").strip()
     if not query:
         print("❌ Please enter a search term!")
         return
     
-    # This uses list comprehension inside storage.find()!
-    results = storage.find(query)
+    # Not every storage backend has the query language (see query.py)
+    run_query = getattr(storage, "query", None)
+    results = None
+    if run_query and looks_like_query(query):
+        try:
+            results = run_query(query)
+        except ValueError as e:
+            print(f"(Not a valid query: {e}. Searching for the text instead.)")
+    if results is None:
+        # This uses list comprehension inside storage.find()!
+        results = storage.find(query)
     
     if not results:
         print(f"🔍 No contacts found matching '{query}'")
+        # Not every storage backend supports typo-tolerant search
+        find_fuzzy = getattr(storage, "find_fuzzy", None)
+        close = find_fuzzy(query, limit=5) if find_fuzzy else []
+        if close:
+            print("   Similar names:")
+            for contact in close:
+                print(f"  - {contact}")
         return
     
     print(f"\n🔍 Found {len(results)} contact(s):")
@@ -113,6 +162,7 @@ def edit_contact(storage):
     
     if not contact:
         print(f"❌ Contact '{name}' not found!")
+        print_suggestions(storage, name)
         return
     
     print(f"Current: {contact}")
@@ -131,8 +181,11 @@ def edit_contact(storage):
         updates["email"] = new_email if new_email.lower() != "none" else None
     
     if updates:
-        storage.update(name, **updates)
-        print(f"✅ Updated: {storage.get_by_name(new_name or name)}")
+        # update() refuses a change that would duplicate another contact
+        if storage.update(name, **updates):
+            print(f"✅ Updated: {storage.get_by_name(new_name or name)}")
+        else:
+            print(f"❌ Contact '{name}' was not updated!")
     else:
         print("ℹ️ No changes made.")
 
@@ -150,6 +203,7 @@ def delete_contact(storage):
     contact = storage.get_by_name(name)
     if not contact:
         print(f"❌ Contact '{name}' not found!")
+        print_suggestions(storage, name)
         return
     
     confirm = input(f"Delete '{contact.name}'? (y/n): ").strip().lower()
@@ -160,47 +214,60 @@ def delete_contact(storage):
         print("ℹ️ Cancelled.")
 
 
-def import_from_api(storage):
+def import_from_api(storage, url=importers.RANDOMUSER_URL):
     """Import sample contacts from an API."""
     print("\n--- Import from API ---")
     
-    try:
-        import requests
-    except ImportError:
+    if not importers.available():
         print("❌ 'requests' library not installed.")
         print("   Run: pip install requests")
         return
     
-    print("Fetching sample contacts from randomuser.me...")
+    count = input("How many contacts? (default: 5): ").strip()
+    try:
+        count = int(count) if count else 5
+    except ValueError:
+        print("❌ Please enter a number!")
+        return
+    if count < 1:
+        print("❌ Please enter a number above 0!")
+        return
+    
+    print(f"Fetching {count} sample contacts from {url}...")
     
     try:
-        response = requests.get("https://randomuser.me/api/?results=5", timeout=10)
-        response.raise_for_status()
+        # Pages are fetched concurrently and saved once for the whole import
+        fetched, imported = importers.import_users(storage, count, url)
+        print(f"✅ Imported {imported} new contact(s) ({fetched} fetched)!")
         
-        users = response.json()["results"]
-        imported = 0
-        
-        for user in users:
-            name = f"{user['name']['first']} {user['name']['last']}"
-            phone = user["phone"]
-            email = user["email"]
-            
-            contact = Contact(name, phone, email)
-            if storage.add(contact):
-                imported += 1
-        
-        print(f"✅ Imported {imported} new contact(s)!")
-        
-    except requests.exceptions.RequestException as e:
+    except importers.requests.exceptions.RequestException as e:
         print(f"❌ API error: {e}")
 
 
+def import_from_file(storage):
+    """Import contacts from a CSV, JSON or vCard file."""
+    print("\n--- Import from File ---")
+    
+    filename = input("File (.csv, .json or .vcf): ").strip()
+    if not filename:
+        print("❌ Filename cannot be empty!")
+        return
+    
+    try:
+        added, duplicates, rejected = storage.import_file(filename)
+    except (OSError, ValueError) as e:
+        print(f"❌ Import failed, nothing was imported: {e}")
+        return
+    
+    print(f"✅ Imported {added} new contact(s), skipped {duplicates} already there.")
+    if rejected:
+        print(f"⚠️  {rejected} invalid record(s) written to {formats.rejects_path(filename)}")
+
+
 def export_to_csv(storage):
     """Export contacts to a CSV file."""
     print("\n--- Export to CSV ---")
     
-    import csv
-    
     if len(storage) == 0:
         print("❌ No contacts to export!")
         return
@@ -208,36 +275,140 @@ def export_to_csv(storage):
     filename = input("Filename (default: contacts_export.csv): ").strip()
     if not filename:
         filename = "contacts_export.csv"
-    if not filename.endswith(".csv"):
-        filename += ".csv"
     
+    compression = input(f"Compress? ({'/'.join(exporters.COMPRESSIONS)}, "
+                        f"default: no): ").strip().lower() or None
+    shards = input("Split into how many files? (default: 1): ").strip()
     try:
-        with open(filename, "w", newline="", encoding="utf-8") as file:
-            writer = csv.writer(file)
-            writer.writerow(["Name", "Phone", "Email"])
-            
-            for contact in storage:
-                writer.writerow([contact.name, contact.phone, contact.email or ""])
-        
-        print(f"✅ Exported {len(storage)} contacts to {filename}")
-        
-    except Exception as e:
+        shards = int(shards) if shards else 1
+    except ValueError:
+        print("❌ Please enter a number!")
+        return
+    
+    run_export(storage, filename, compression, shards)
+
+
+def run_export(storage, filename, compression=None, shards=1):
+    """
+    Export contacts with the storage's export engine and report the speed.
+    
+    Returns:
+        bool: True if the export succeeded
+    """
+    try:
+        rows, seconds, paths = storage.export_csv(filename, compression, shards)
+    except (OSError, ValueError) as e:
         print(f"❌ Export error: {e}")
+        return False
+    
+    names = ", ".join(str(path) for path in paths)
+    print(f"✅ Exported {rows} contacts to {names} "
+          f"({rows / max(seconds, 1e-9):,.0f} contacts/s)")
+    return True
 
 
-def main():
+def open_storage(filepath, backend=None, journal=False, write_behind=False, shared=False):
+    """
+    Open the contact storage, picking the backend.
+    
+    Args:
+        filepath (str): Path to the contacts file or database
+        backend (str, optional): "json", "sqlite" or "mapped"; guessed from
+            the file extension if not given
+        journal (bool): For the JSON backend, append changes to a log
+        write_behind (bool): For the JSON backend, save from a background
+            thread after a burst of changes
+        shared (bool): For the JSON backend, lock the file so other
+            programs can use it at the same time
+    
+    Returns:
+        ContactStorage, SQLiteContactStorage or MappedContactStorage: The
+            opened storage
+    """
+    filepath = Path(filepath)
+    if backend is None:
+        suffix = filepath.suffix.lower()
+        if suffix in SQLITE_EXTENSIONS:
+            backend = "sqlite"
+        elif suffix in MAPPED_EXTENSIONS:
+            backend = "mapped"
+        else:
+            backend = "json"
+    
+    if backend == "json":
+        return ContactStorage(filepath, journal=journal, write_behind=write_behind,
+                              shared=shared)
+    
+    if backend == "mapped":
+        legacy = filepath.with_name("contacts.json")
+        if not filepath.exists() and legacy.exists():
+            count = write_mapped(filepath, ContactReader(legacy))
+            print(f"Built {filepath} from {legacy} ({count} contacts)")
+        return MappedContactStorage(filepath)
+    
+    # One-shot migration: a brand-new database starts from contacts.json
+    is_new = not filepath.exists()
+    storage = SQLiteContactStorage(filepath)
+    legacy = filepath.with_name("contacts.json")
+    if is_new and legacy.exists():
+        storage.migrate_from_json(legacy)
+    return storage
+
+
+def parse_args(argv=None):
+    """Parse the command-line options."""
+    parser = argparse.ArgumentParser(description="Contact Manager 2.0")
+    parser.add_argument("file", nargs="?", default="contacts.json",
+                        help="contacts file (default: contacts.json)")
+    parser.add_argument("--backend", choices=["json", "sqlite", "mapped"],
+                        help="storage engine (default: picked from the file extension)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--journal", action="store_true",
+                      help="JSON backend: append changes to a log instead of rewriting the file")
+    mode.add_argument("--write-behind", action="store_true",
+                      help="JSON backend: save in the background after a burst of changes")
+    parser.add_argument("--shared", action="store_true",
+                        help="JSON backend: lock the file so several programs can use it at once")
+    parser.add_argument("--api-url", default=importers.RANDOMUSER_URL,
+                        help="where 'Import from API' fetches users (default: randomuser.me)")
+    export = parser.add_argument_group("export without opening the menu")
+    export.add_argument("--export", metavar="CSV", help="export the contacts to a CSV file")
+    export.add_argument("--compress", choices=list(exporters.COMPRESSIONS),
+                        help="compress the export")
+    export.add_argument("--shards", type=int, default=1,
+                        help="split the export into this many files, written in parallel")
+    args = parser.parse_args(argv)
+    if args.shared and args.write_behind:
+        parser.error("--shared can't be combined with --write-behind")
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
+    return args
+
+
+def main(argv=None):
     """Main application loop."""
+    args = parse_args(argv)
     print("\n🚀 Starting Contact Manager 2.0...")
     
     # Initialize storage (loads existing contacts)
-    storage = ContactStorage("contacts.json")
+    storage = open_storage(args.file, args.backend, args.journal, args.write_behind,
+                           args.shared)
+    
+    if args.export:
+        # One-shot export from the command line, no menu
+        exported = run_export(storage, args.export, args.compress, args.shards)
+        storage.close()
+        raise SystemExit(0 if exported else 1)
     
     while True:
         print_menu()
         
-        choice = input("Enter choice (0-7): ").strip()
+        choice = input("Enter choice (0-8): ").strip()
         
-        if choice == "1":
+        # Not every storage backend can be changed
+        if choice in CHANGES and getattr(storage, "read_only", False):
+            print("❌ This contacts file is read-only!")
+        elif choice == "1":
             add_contact(storage)
         elif choice == "2":
             list_contacts(storage)
@@ -248,9 +419,11 @@ def main():
         elif choice == "5":
             delete_contact(storage)
         elif choice == "6":
-            import_from_api(storage)
+            import_from_api(storage, args.api_url)
         elif choice == "7":
             export_to_csv(storage)
+        elif choice == "8":
+            import_from_file(storage)
         elif choice == "0":
             print("\n👋 Goodbye!")
             break
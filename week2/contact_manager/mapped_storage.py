@@ -0,0 +1,397 @@
+"""
+Memory-mapped storage module for the Contact Manager 2.0 project.
+
+ContactStorage reads every contact into memory when it starts, which is too
+slow and too big for a read-mostly file of millions of contacts.
+MappedContactStorage opens a read-only binary file with mmap instead: the
+operating system pages in only the parts that are actually read, so opening
+is instant whatever the size, and a contact is decoded only when it is asked
+for.
+
+File layout (all integers little-endian):
+    
+    header        magic, contact count, offset of the offset table,
+                  offset of the name index
+    records       one per contact, in storage order: the byte lengths of
+                  name, phone and email (0xFFFF = no email), then the three
+                  UTF-8 strings
+    offset table  one 8-byte file offset per record, so record i is found
+                  in O(1)
+    name index    record numbers sorted by lower-cased name (ties in storage
+                  order), searched with binary search
+
+Files are made with write_mapped(); main.py builds one from contacts.json the
+first time a .cmap file is opened.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from contextlib import contextmanager
+from pathlib import Path
+from contact import Contact
+import exporters
+from streaming import ContactReader
+
+
+MAGIC = b"CMMAP1\0\0"
+HEADER = struct.Struct("<8sQQQ")  # magic, count, offsets at, name index at
+LENGTHS = struct.Struct("<HHH")    # name, phone and email lengths
+NO_EMAIL = 0xFFFF
+
+
+def _encode(contact):
+    """Pack one contact as a record."""
+    name = contact.name.encode("utf-8")
+    phone = contact.phone.encode("utf-8")
+    email = b"" if contact.email is None else contact.email.encode("utf-8")
+    if max(len(name), len(phone), len(email)) >= NO_EMAIL:
+        raise ValueError(f"Contact '{contact.name}' has a field that is too long")
+    email_length = NO_EMAIL if contact.email is None else len(email)
+    return LENGTHS.pack(len(name), len(phone), email_length) + name + phone + email
+
+
+def write_mapped(path, contacts):
+    """
+    Write contacts to a file that MappedContactStorage can open.
+    
+    The contacts are streamed to disk; only their offsets and lower-cased
+    names are kept in memory, to build the name index at the end. The file
+    is written under a temporary name and renamed into place when complete.
+    
+    Args:
+        path (str): File to write
+        contacts (iterable): Contacts, in storage order (a ContactReader
+            works, so a JSON file never has to fit in memory)
+    
+    Returns:
+        int: Number of contacts written
+    """
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    offsets = array("Q")
+    keys = []
+    try:
+        with open(tmp, "wb") as file:
+            file.write(bytes(HEADER.size))
+            position = HEADER.size
+            for contact in contacts:
+                record = _encode(contact)
+                offsets.append(position)
+                keys.append(contact.name_key)
+                file.write(record)
+                position += len(record)
+            
+            # sorted() is stable, so equal names stay in storage order
+            order = array("I", sorted(range(len(keys)), key=keys.__getitem__))
+            for table in (offsets, order):
+                if sys.byteorder == "big":
+                    table.byteswap()
+                file.write(table.tobytes())
+            index_at = position + offsets.itemsize * len(offsets)
+            file.seek(0)
+            file.write(HEADER.pack(MAGIC, len(offsets), position, index_at))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return len(offsets)
+
+
+def _table(buffer, start, stop, typecode):
+    """
+    A table of little-endian unsigned integers from the file.
+    
+    On little-endian machines (nearly all of them) this is a view straight
+    into the mapped file, so nothing is read until an entry is used.
+    """
+    view = memoryview(buffer)[start:stop].cast(typecode)
+    if sys.byteorder == "little":
+        return view
+    table = array(typecode, view)
+    view.release()
+    table.byteswap()
+    return table
+
+
+class MappedContactStorage:
+    """
+    Read-only contacts in a memory-mapped file.
+    
+    Has the same methods as ContactStorage. Reading methods work as usual;
+    add/remove/update print a message and change nothing. Contacts are
+    decoded from the file on demand, so each call returns new copies.
+    
+    Attributes:
+        filepath (Path): Path to the .cmap file
+        read_only (bool): Always True
+    
+    Example:
+        >>> write_mapped("contacts.cmap", ContactReader("contacts.json"))
+        >>> storage = MappedContactStorage("contacts.cmap")
+        >>> storage.get_by_name("alice smith")
+    """
+    
+    read_only = True
+    
+    def __init__(self, filepath="contacts.cmap"):
+        """
+        Open a contacts file.
+        
+        Args:
+            filepath (str): Path to a file made by write_mapped(). A missing
+                file opens as an empty storage.
+        
+        Raises:
+            ValueError: If the file is not a contacts file
+        """
+        self.filepath = Path(filepath)
+        self._file = self._map = None
+        self._offsets = self._name_index = None
+        self._count = 0
+        self.load()
+    
+    def load(self):
+        """(Re)open the file, e.g. after it was rebuilt."""
+        self.close()
+        if not self.filepath.exists():
+            return
+        
+        self._file = open(self.filepath, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, count, offsets_at, index_at = HEADER.unpack_from(self._map)
+            if (magic != MAGIC or offsets_at + 8 * count != index_at
+                    or index_at + 4 * count != len(self._map)):
+                raise ValueError(f"{self.filepath} is not a contacts file")
+        except (ValueError, struct.error) as e:
+            self.close()
+            raise ValueError(f"{self.filepath} is not a contacts file") from e
+        
+        self._count = count
+        self._offsets = _table(self._map, offsets_at, index_at, "Q")
+        self._name_index = _table(self._map, index_at, len(self._map), "I")
+    
+    def close(self):
+        """Unmap and close the file."""
+        # Views must be released before the map can be closed
+        for table in (self._offsets, self._name_index):
+            if isinstance(table, memoryview):
+                table.release()
+        if self._map is not None:
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
+        self._file = self._map = None
+        self._offsets = self._name_index = None
+        self._count = 0
+    
+    def save(self):
+        """
+        Nothing to do: the file is read-only.
+        
+        Returns:
+            bool: Always True
+        """
+        return True
+    
+    @contextmanager
+    def batch(self):
+        """Accepted for compatibility; there are no changes to group."""
+        yield self
+    
+    def _read(self, position):
+        """
+        Decode the record at a file offset.
+        
+        Returns:
+            tuple: (contact, offset of the next record)
+        """
+        buffer = self._map
+        name_length, phone_length, email_length = LENGTHS.unpack_from(buffer, position)
+        start = position + LENGTHS.size
+        phone_at = start + name_length
+        email_at = phone_at + phone_length
+        name = str(buffer[start:phone_at], "utf-8")
+        phone = str(buffer[phone_at:email_at], "utf-8")
+        if email_length == NO_EMAIL:
+            email, end = None, email_at
+        else:
+            end = email_at + email_length
+            email = str(buffer[email_at:end], "utf-8")
+        # The file was written from Contact objects, so it is trusted
+        return Contact.from_fields(name, phone, email), end
+    
+    def _record(self, number):
+        """Decode the contact with the given record number."""
+        return self._read(self._offsets[number])[0]
+    
+    def _name_key(self, rank):
+        """Lower-cased name of the rank-th contact in name order."""
+        position = self._offsets[self._name_index[rank]]
+        start = position + LENGTHS.size
+        (name_length,) = struct.unpack_from("<H", self._map, position)
+        return str(self._map[start:start + name_length], "utf-8").lower()
+    
+    def _first_rank(self, key):
+        """First position in the name index whose name is >= key."""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._name_key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+    
+    def get_by_name(self, name):
+        """
+        Get a specific contact by exact name (ignoring case).
+        
+        Binary-searches the name index, decoding about log2(n) names.
+        
+        Args:
+            name (str): Exact name to search for
+        
+        Returns:
+            Contact or None: The contact if found
+        """
+        key = name.lower()
+        rank = self._first_rank(key)
+        if rank == self._count:
+            return None
+        contact = self._record(self._name_index[rank])
+        return contact if contact.name_key == key else None
+    
+    def complete(self, prefix, limit=10):
+        """
+        Suggest contact names that start with some text.
+        
+        Args:
+            prefix (str): The start of a name (case doesn't matter)
+            limit (int): Maximum number of suggestions
+        
+        Returns:
+            list: Distinct names in alphabetical order
+        """
+        prefix = prefix.lower()
+        names = []
+        last = None
+        for rank in range(self._first_rank(prefix), self._count):
+            key = self._name_key(rank)
+            if not key.startswith(prefix) or len(names) == limit:
+                break
+            if key != last:
+                names.append(self._record(self._name_index[rank]).name)
+                last = key
+        return names
+    
+    def find(self, query):
+        """
+        Find contacts matching a search query.
+        
+        Checks every record while streaming through the file.
+        
+        Args:
+            query (str): Search string to match against name, phone, or email
+        
+        Returns:
+            list: List of matching Contact objects
+        """
+        return [c for c in self if c.matches(query)]
+    
+    def get_all(self):
+        """
+        Get all contacts.
+        
+        Returns:
+            list: Every contact, in storage order
+        """
+        return list(self)
+    
+    def export_csv(self, path, compression=None, shards=1, workers=None):
+        """
+        Export the contacts to CSV, see exporters.export_csv().
+        
+        Args:
+            path (str): File to write
+            compression (str, optional): "gzip", "bz2" or "lzma"
+            shards (int): Number of files to split the contacts into
+            workers (int, optional): Processes writing shards at once
+                (ignored: shards are written in turn)
+        
+        Returns:
+            tuple: (rows written, seconds taken, list of files written)
+        """
+        # Decodes the contacts from the file as it goes, so they are never
+        # all in memory; the shards are written one after another
+        return exporters.export_csv(self, path, compression, shards, workers=1)
+    
+    def _read_only(self):
+        """Tell the user that changes are not possible."""
+        print(f"{self.filepath} is read-only!")
+    
+    def add(self, contact):
+        """Not supported: prints a message and returns False."""
+        self._read_only()
+        return False
+    
+    def add_many(self, contacts):
+        """Not supported: prints a message and returns 0."""
+        self._read_only()
+        return 0
+    
+    def remove(self, name):
+        """Not supported: prints a message and returns False."""
+        self._read_only()
+        return False
+    
+    def update(self, name, **kwargs):
+        """Not supported: prints a message and returns False."""
+        self._read_only()
+        return False
+    
+    def update_many(self, changes):
+        """Not supported: prints a message and returns 0."""
+        self._read_only()
+        return 0
+    
+    def __len__(self):
+        """Return the number of contacts (stored in the header)."""
+        return self._count
+    
+    def __iter__(self):
+        """Iterate over contacts, decoding them from the file as we go."""
+        position = HEADER.size
+        for _ in range(self._count):
+            contact, position = self._read(position)
+            yield contact
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import tempfile
+    
+    print("Testing MappedContactStorage...")
+    
+    with tempfile.TemporaryDirectory() as folder:
+        path = Path(folder) / "test_contacts.cmap"
+        count = write_mapped(path, ContactReader(Path(__file__).with_name("contacts.json")))
+        storage = MappedContactStorage(path)
+        print(f"Wrote and opened {count} contacts ({path.stat().st_size} bytes)")
+        
+        print(f"\nAll contacts ({len(storage)} total):")
+        for contact in storage:
+            print(f"  - {contact}")
+        
+        first = next(iter(storage))
+        print(f"\nget_by_name({first.name.upper()!r}): {storage.get_by_name(first.name.upper())}")
+        print(f"complete('a'): {storage.complete('a')}")
+        storage.add(first)
+        storage.close()
+    
+    print("\nTest complete! (test file deleted)")
@@ -0,0 +1,138 @@
+"""
+Parallel search for the Contact Manager 2.0 project.
+
+A plain search checks every contact on one CPU core. ParallelScanner splits
+the contacts into chunks and checks them in several worker processes at once.
+
+The contacts are handed to the workers only once: the workers are started
+with fork(), so each one starts as a copy of this process and already has
+the contacts in memory. Each search then sends just the query and a chunk
+range to each worker, and gets back the positions that matched.
+
+fork() is not available on Windows; available() tells you whether this
+module can be used.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+# The contacts the worker processes search. Set just before the workers are
+# forked, so each worker inherits it; never sent over a pipe.
+_snapshot = None
+
+
+def available():
+    """Check whether parallel search is supported on this platform."""
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def _ready(_):
+    """Runs in a worker: confirms it has started."""
+    return os.getpid()
+
+
+def _scan(query, start, stop):
+    """Runs in a worker: positions in [start, stop) that match the query."""
+    contacts = _snapshot
+    return [i for i in range(start, stop) if contacts[i].matches(query)]
+
+
+class ParallelScanner:
+    """
+    Searches a fixed list of contacts with a pool of worker processes.
+    
+    The scanner works on a snapshot: changes to the storage afterwards are
+    not seen. ContactStorage checks the contacts changed since itself, and
+    only makes a new scanner once many of them have changed.
+    
+    A search can be running in another thread when the scanner is closed:
+    take the scanner with acquire() and give it back with release(), and
+    close() leaves the workers running until every search has given it back.
+    
+    Attributes:
+        contacts (list): The snapshot being searched
+        workers (int): Number of worker processes
+    """
+    
+    def __init__(self, contacts, workers=None, chunks_per_worker=4):
+        """
+        Start the worker processes.
+        
+        Args:
+            contacts (list): Contacts to search
+            workers (int, optional): Number of processes (default: one per CPU)
+            chunks_per_worker (int): Split the work finer than one chunk per
+                worker, so a slow chunk doesn't leave the others idle
+        """
+        global _snapshot
+        
+        self.contacts = contacts
+        self.workers = workers or os.cpu_count() or 1
+        count = self.workers * chunks_per_worker
+        size = -(-len(contacts) // count) or 1
+        self.chunks = [(start, min(start + size, len(contacts)))
+                       for start in range(0, len(contacts), size)]
+        
+        self._lock = threading.Lock()
+        self._users = 0
+        self._closed = False
+        
+        _snapshot = contacts
+        try:
+            self._executor = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("fork"))
+            # A fork pool starts all its workers on the first task, so once
+            # these have run every worker holds the snapshot.
+            list(self._executor.map(_ready, range(self.workers)))
+        finally:
+            _snapshot = None
+    
+    def positions(self, query):
+        """
+        Find where the matching contacts are in the snapshot.
+        
+        Returns:
+            list: Positions of the matching contacts, in increasing order
+        """
+        futures = [self._executor.submit(_scan, query, start, stop)
+                   for start, stop in self.chunks]
+        # Chunks are in order, so concatenating their results keeps the order
+        return [i for future in futures for i in future.result()]
+    
+    def find(self, query):
+        """
+        Find contacts matching a search query (same rules as Contact.matches).
+        
+        Returns:
+            list: Matching contacts, in snapshot order
+        """
+        contacts = self.contacts
+        return [contacts[i] for i in self.positions(query)]
+    
+    def acquire(self):
+        """Keep the workers running until release() (see close())."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The scanner is closed")
+            self._users += 1
+    
+    def release(self):
+        """Give back a scanner taken with acquire()."""
+        with self._lock:
+            self._users -= 1
+            shutdown = self._closed and not self._users
+        if shutdown:
+            self._executor.shutdown(wait=False)
+    
+    def close(self):
+        """Stop the worker processes, once no search is using them."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            shutdown = not self._users
+        if shutdown:
+            self._executor.shutdown(cancel_futures=True)
@@ -0,0 +1,577 @@
+"""
+Query language module for the Contact Manager 2.0 project.
+
+ContactStorage.find() checks one string against the name, phone and email
+at once. The queries here can say which field they mean and combine
+conditions:
+    
+    name:smith                    name contains "smith"
+    name:="Ann Lee"               name is exactly "Ann Lee"
+    name:ann*                     name starts with "ann" (* and ? are wildcards)
+    phone:*4567                   phone digits end with 4567
+    phone:="(555) 123-4567"       phone is this number, however it is written
+    email:*@example.com           email is at example.com
+    email:                        has an email (any value)
+    NOT email:                    has no email
+    smith                         any field contains "smith", like find()
+
+Conditions are combined with AND, OR and NOT (in capitals) and brackets;
+conditions next to each other are ANDed:
+    
+    email:*@example.com name:smith
+    (name:ann* OR name:anne*) AND NOT email:
+
+Case never matters, and phone conditions only look at the digits.
+
+The Planner turns a parsed query into a Plan: for each condition it looks
+at the indexes that could answer it (the name dictionary, the prefix,
+phone, trigram and email domain indexes; see indexes.py), asks them how
+many contacts they would return, and starts from the smallest set. The
+query is then checked on just those contacts. A contact can only be found
+by scanning all of them when no condition can use an index, for example a
+lone NOT or an OR with an unindexed side. Plan.explain() shows the choice.
+"""
+
+import re
+from functools import partial
+from indexes import EmailDomainIndex, PhoneIndex, PrefixIndex, TrigramIndex
+
+
+FIELDS = ("name", "phone", "email")
+OPERATORS = ("AND", "OR", "NOT")
+
+# Something only a query (not a plain search term) would contain. Brackets
+# are left out: "(555) 123" is a plain search for a phone number.
+_QUERY_HINT = re.compile(r"(?i:\b(?:name|phone|email):)|\b(?:AND|OR|NOT)\b")
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<paren>[()])
+      | (?P<field>[A-Za-z]+):(?P<exact>=)?(?P<value>"[^"]*"|[^\s()"]*)
+      | (?P<word>"[^"]*"|[^\s()"]+)
+    )
+""", re.VERBOSE)
+
+
+def _glob(pattern):
+    """
+    Compile a wildcard pattern to a regex matching whole values.
+    
+    Only * (any text) and ? (one character) are wildcards; everything else,
+    [ and ] included, stands for itself. The planner's prefix, suffix and
+    domain lookups rely on that.
+    """
+    parts = [".*" if part == "*" else "." if part == "?" else re.escape(part)
+             for part in re.split(r"([*?])", pattern)]
+    return re.compile("".join(parts) + r"\Z", re.DOTALL)
+
+
+class Term:
+    """
+    One condition on one field (or on any field).
+    
+    Attributes:
+        field (str or None): "name", "phone", "email", or None for any field
+        kind (str): "contains", "equals", "glob" or "present"
+        value (str): Lower-cased (for phone: just digits and wildcards)
+    """
+    
+    def __init__(self, field, value, exact=False):
+        """
+        Build a condition from what was typed.
+        
+        Args:
+            field (str or None): The field, or None for any field
+            value (str): The text after the colon, quotes removed
+            exact (bool): The value was written as field:=value
+        
+        Raises:
+            ValueError: If the value can't be used for the field
+        """
+        self.field = field
+        value = value.lower()
+        if field == "phone" and value:
+            digits = re.sub(r"[^0-9*?]", "", value)
+            if not digits:
+                raise ValueError(f"phone:{value} has no digits")
+            value = digits
+        if exact:
+            if not value:
+                raise ValueError(f"{field or 'A search'}:= needs a value")
+            self.kind = "equals"
+        elif not value:
+            if field is None:
+                raise ValueError("Empty search term")
+            self.kind = "present"
+        elif "*" in value or "?" in value:
+            self.kind = "glob"
+            self._pattern = _glob(value)
+        else:
+            self.kind = "contains"
+        self.value = value
+    
+    def _values(self, contact):
+        """The field values this condition looks at."""
+        if self.field == "name":
+            return (contact.name_key,)
+        if self.field == "phone":
+            return (contact.phone_digits,)
+        if self.field == "email":
+            return (contact.email_key,) if contact.email else ()
+        # Any field: the same fields find() looks at
+        values = (contact.name_key, contact.phone)
+        return values + (contact.email_key,) if contact.email else values
+    
+    def matches(self, contact):
+        """Check whether a contact meets the condition."""
+        values = self._values(contact)
+        if self.kind == "contains":
+            return any(self.value in v for v in values)
+        if self.kind == "equals":
+            return self.value in values
+        if self.kind == "glob":
+            return any(self._pattern.match(v) for v in values)
+        return any(values)  # present
+    
+    def literal(self):
+        """The longest run of the value without wildcards."""
+        return max(re.split(r"[*?]", self.value), key=len)
+    
+    def __str__(self):
+        """The condition written back in the query language."""
+        field = f"{self.field}:" if self.field else ""
+        value = f'"{self.value}"' if " " in self.value else self.value
+        return f"{field}={value}" if self.kind == "equals" else f"{field}{value}"
+
+
+class Not:
+    """A condition that must not hold."""
+    
+    def __init__(self, child):
+        self.child = child
+    
+    def matches(self, contact):
+        """Check whether a contact meets the condition."""
+        return not self.child.matches(contact)
+    
+    def __str__(self):
+        return f"NOT {self.child}"
+
+
+class And:
+    """Conditions that must all hold."""
+    
+    def __init__(self, children):
+        self.children = children
+    
+    def matches(self, contact):
+        """Check whether a contact meets the condition."""
+        return all(child.matches(contact) for child in self.children)
+    
+    def __str__(self):
+        return "(" + " AND ".join(map(str, self.children)) + ")"
+
+
+class Or:
+    """Conditions of which at least one must hold."""
+    
+    def __init__(self, children):
+        self.children = children
+    
+    def matches(self, contact):
+        """Check whether a contact meets the condition."""
+        return any(child.matches(contact) for child in self.children)
+    
+    def __str__(self):
+        return "(" + " OR ".join(map(str, self.children)) + ")"
+
+
+def looks_like_query(text):
+    """
+    Check whether a search uses the query language rather than being a
+    plain search term: it names a field or uses AND, OR or NOT.
+    """
+    return _QUERY_HINT.search(text) is not None
+
+
+def _tokens(text):
+    """
+    Split a query into tokens.
+    
+    Returns:
+        list: ("(" or ")", None), ("op", "AND"/"OR"/"NOT") or ("term", Term)
+    
+    Raises:
+        ValueError: On an unknown field or an unclosed quote
+    """
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Unexpected {text[position:].strip()[:10]!r} "
+                             f"(is a quote not closed?)")
+        position = match.end()
+        if match["paren"]:
+            tokens.append((match["paren"], None))
+        elif match["field"]:
+            field = match["field"].lower()
+            if field not in FIELDS:
+                raise ValueError(f"Unknown field '{match['field']}' "
+                                 f"(use {', '.join(FIELDS)})")
+            tokens.append(("term", Term(field, match["value"].strip('"'), bool(match["exact"]))))
+        elif match["word"] in OPERATORS:
+            tokens.append(("op", match["word"]))
+        else:
+            tokens.append(("term", Term(None, match["word"].strip('"'))))
+    return tokens
+
+
+def parse(text):
+    """
+    Parse a query (see the module docstring for the language).
+    
+    NOT binds tighter than AND, and AND tighter than OR, so
+    "a OR b c" means "a OR (b AND c)".
+    
+    Args:
+        text (str): The query
+    
+    Returns:
+        Term, Not, And or Or: The parsed query; each has matches(contact)
+    
+    Raises:
+        ValueError: If the query isn't valid
+    
+    Example:
+        >>> print(parse("email:*@example.com name:smith"))
+        (email:*@example.com AND name:smith)
+    """
+    tokens = _tokens(text)
+    position = 0
+    
+    def peek():
+        return tokens[position] if position < len(tokens) else (None, None)
+    
+    def take():
+        nonlocal position
+        position += 1
+        return tokens[position - 1]
+    
+    def either():
+        children = [both()]
+        while peek() == ("op", "OR"):
+            take()
+            children.append(both())
+        return children[0] if len(children) == 1 else Or(children)
+    
+    def both():
+        children = [single()]
+        while True:
+            kind, value = peek()
+            if (kind, value) == ("op", "AND"):
+                take()
+            elif kind not in ("term", "(") and (kind, value) != ("op", "NOT"):
+                break
+            children.append(single())
+        return children[0] if len(children) == 1 else And(children)
+    
+    def single():
+        kind, value = peek()
+        if kind is None:
+            raise ValueError("The query ends too early")
+        take()
+        if kind == "term":
+            return value
+        if (kind, value) == ("op", "NOT"):
+            return Not(single())
+        if kind == "(":
+            inner = either()
+            if peek()[0] != ")":
+                raise ValueError("Missing ')'")
+            take()
+            return inner
+        raise ValueError(f"Unexpected '{value or kind}'")
+    
+    if not tokens:
+        raise ValueError("Empty query")
+    tree = either()
+    if position < len(tokens):
+        raise ValueError(f"Unexpected '{tokens[position][1] or tokens[position][0]}'")
+    return tree
+
+
+class Lookup:
+    """
+    Getting candidate ids from one index for one condition.
+    
+    Attributes:
+        term (Term): The condition
+        index (str): Which index, for explain()
+        estimate (int): How many ids it returns (or at most returns)
+        exact (bool): The ids are exactly the contacts meeting the
+            condition, not just candidates to check
+    """
+    
+    def __init__(self, term, index, estimate, fetch, exact):
+        self.term = term
+        self.index = index
+        self.estimate = estimate
+        self.exact = exact
+        self._fetch = fetch
+    
+    def ids(self):
+        """The candidate ids (a new collection, safe to keep)."""
+        return list(self._fetch())
+    
+    def describe(self):
+        """Lines for explain()."""
+        size = f"{self.estimate:,}" if self.exact else f"at most {self.estimate:,}"
+        return [f"{self.index} for {self.term}: {size}"]
+
+
+class Union:
+    """The candidates of several lookups together (for OR)."""
+    
+    def __init__(self, parts):
+        self.parts = parts
+        self.estimate = sum(part.estimate for part in parts)
+        self.exact = False
+    
+    def ids(self):
+        """The candidate ids."""
+        ids = set()
+        for part in self.parts:
+            ids.update(part.ids())
+        return ids
+    
+    def describe(self):
+        """Lines for explain()."""
+        lines = [f"union of (at most {self.estimate:,}):"]
+        for part in self.parts:
+            lines.extend("  " + line for line in part.describe())
+        return lines
+
+
+class Plan:
+    """
+    How a query will be answered.
+    
+    Attributes:
+        tree: The parsed query
+        access (Lookup, Union or None): Where the candidates come from;
+            None means every contact is checked
+        check (bool): Whether candidates still have to be checked against
+            the query (not when one exact lookup is the whole query)
+        total (int): Contacts in the storage
+        rows (int): Estimated number of results
+        considered (list): (Term, Lookup) pairs for the indexes that were
+            looked at
+    """
+    
+    def __init__(self, tree, access, total, rows, considered):
+        self.tree = tree
+        self.access = access
+        self.check = not (access is not None and access.exact and access.term is tree)
+        self.total = total
+        self.rows = rows
+        self.considered = considered
+    
+    def candidates(self):
+        """
+        The ids to check, or None to check every contact.
+        
+        Reads the indexes, so call it with the storage locked.
+        """
+        return None if self.access is None else self.access.ids()
+    
+    def explain(self):
+        """
+        Describe the plan, with estimated numbers of contacts.
+        
+        Returns:
+            str: Several lines of text
+        """
+        lines = [f"Query: {self.tree}"]
+        if self.access is None:
+            lines.append(f"  Scan all {self.total:,} contacts (no index applies)")
+        else:
+            describe = self.access.describe()
+            lines.append(f"  Candidates from {describe[0]}")
+            lines.extend("  " + line for line in describe[1:])
+            if self.check:
+                lines.append("  Check each candidate against the whole query")
+        skipped = [lookup for lookup in self.considered if not self._uses(lookup)]
+        if skipped:
+            lines.append("  Not used (less selective):")
+            lines.extend("    " + lookup.describe()[0] for lookup in skipped)
+        share = self.rows / self.total if self.total else 0
+        lines.append(f"  Estimated results: at most {self.rows:,} of {self.total:,} ({share:.1%})")
+        return "\n".join(lines)
+    
+    def _uses(self, lookup):
+        """Check whether a lookup is part of the chosen access path."""
+        if isinstance(self.access, Union):
+            return lookup in self.access.parts
+        return lookup is self.access
+    
+    def __str__(self):
+        return self.explain()
+
+
+class Planner:
+    """
+    Picks the indexes that answer a query with the fewest contacts checked.
+    
+    Example:
+        >>> planner = Planner(len(records), by_name, get_index)
+        >>> plan = planner.plan(parse("name:smith"))
+        >>> print(plan.explain())
+    """
+    
+    def __init__(self, total, by_name, index):
+        """
+        Initialize the planner.
+        
+        Args:
+            total (int): Number of contacts
+            by_name (dict): Lower-cased name -> set of ids
+            index (callable): Takes an index class from indexes.py and
+                returns that index, built and up to date
+        """
+        self.total = total
+        self.by_name = by_name
+        self.index = index
+    
+    def lookups(self, term):
+        """
+        The ways an index can answer a condition.
+        
+        Returns:
+            list: Lookup objects (empty if only a scan can answer it)
+        """
+        field, kind, value = term.field, term.kind, term.value
+        found = []
+        if field == "name" and kind == "equals":
+            found.append(Lookup(term, "name dictionary", len(self.by_name.get(value, ())),
+                                partial(self.by_name.get, value, ()), True))
+        if field == "name" and kind == "glob" and value.endswith("*"):
+            prefix = value[:-1]
+            if prefix and "*" not in prefix and "?" not in prefix:
+                index = self.index(PrefixIndex)
+                found.append(Lookup(term, "name prefix index", index.count(prefix),
+                                    partial(index.starting_with, prefix), True))
+        if field == "phone" and kind == "equals":
+            index = self.index(PhoneIndex)
+            found.append(Lookup(term, "phone index", len(index.lookup(value)),
+                                partial(index.lookup, value), True))
+        if field == "phone" and kind == "glob" and value.startswith("*"):
+            suffix = value[1:]
+            if suffix and "*" not in suffix and "?" not in suffix:
+                index = self.index(PhoneIndex)
+                found.append(Lookup(term, "phone suffix index", index.count_ending_with(suffix),
+                                    partial(index.ending_with, suffix), True))
+        if field == "email" and kind in ("equals", "glob") and "@" in value:
+            domain = value.rsplit("@", 1)[1]
+            if domain and "*" not in domain and "?" not in domain:
+                index = self.index(EmailDomainIndex)
+                exact = kind == "glob" and value == "*@" + domain
+                found.append(Lookup(term, "email domain index", len(index.lookup(domain)),
+                                    partial(index.lookup, domain), exact))
+        if field != "phone" and kind in ("contains", "equals", "glob"):
+            # The trigram index covers name, phone and email, so it gives
+            # candidates for any text condition that has 3 letters in a row
+            text = term.literal() if kind == "glob" else value
+            index = self.index(TrigramIndex)
+            estimate = index.estimate(text)
+            if estimate is not None:
+                found.append(Lookup(term, "trigram index", estimate,
+                                    partial(index.candidates, text), False))
+        return found
+    
+    def plan(self, tree):
+        """
+        Make the cheapest plan for a parsed query.
+        
+        Args:
+            tree: The output of parse()
+        
+        Returns:
+            Plan: The plan
+        """
+        lookups = {}  # Term -> its Lookups, worked out once
+        considered = []
+        access = self._access(tree, lookups, considered)
+        rows = self._rows(tree, lookups)
+        if access is not None and access.estimate >= self.total:
+            access = None  # The index would give back everything anyway
+        return Plan(tree, access, self.total, rows, considered)
+    
+    def _lookups(self, term, lookups):
+        """lookups(term), remembered in the `lookups` dict."""
+        found = lookups.get(term)
+        if found is None:
+            found = lookups[term] = self.lookups(term)
+        return found
+    
+    def _access(self, node, lookups, considered):
+        """The cheapest way to get candidates for a node, or None for a scan."""
+        if isinstance(node, Term):
+            found = self._lookups(node, lookups)
+            considered.extend(found)
+            return min(found, key=lambda lookup: lookup.estimate, default=None)
+        if isinstance(node, And):
+            # Every result meets every condition, so the smallest set of
+            # candidates for any one condition will do
+            options = [self._access(child, lookups, considered) for child in node.children]
+            return min((option for option in options if option is not None),
+                       key=lambda option: option.estimate, default=None)
+        if isinstance(node, Or):
+            # A result may meet any one condition, so every condition
+            # needs its candidates
+            options = [self._access(child, lookups, considered) for child in node.children]
+            if any(option is None for option in options):
+                return None
+            return Union(options)
+        return None  # NOT: the contacts that don't match can't be looked up
+    
+    def _rows(self, node, lookups):
+        """Estimate the number of results of a node."""
+        if isinstance(node, Term):
+            found = self._lookups(node, lookups)
+            return min((lookup.estimate for lookup in found), default=self.total)
+        if isinstance(node, And):
+            return min(self._rows(child, lookups) for child in node.children)
+        if isinstance(node, Or):
+            return min(self.total, sum(self._rows(child, lookups) for child in node.children))
+        child = node.child
+        if isinstance(child, Term) and any(lookup.exact for lookup in self._lookups(child, lookups)):
+            return self.total - self._rows(child, lookups)
+        return self.total
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    from contact import Contact
+    
+    contacts = [
+        Contact("Alice Smith", "123-456-7890", "alice@example.com"),
+        Contact("Bob Smith", "(555) 123 4567"),
+        Contact("Carol Jones", "555-123-4567", "carol@mail.org"),
+    ]
+    
+    print("Testing parse...")
+    for text in ["email:*@example.com AND name:smith", "NOT email:", "email:", "phone:*4567",
+                 "name:bob* OR name:=\"carol jones\"", "name:smith phone:*4567"]:
+        tree = parse(text)
+        found = [c.name for c in contacts if tree.matches(c)]
+        print(f"  {text!r} -> {tree} -> {found}")
+    
+    for text in ["name:(", "color:red", "a AND", '"open']:
+        try:
+            parse(text)
+        except ValueError as e:
+            print(f"  {text!r} -> error: {e}")
+    
+    print("\nTest complete!")
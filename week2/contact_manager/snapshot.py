@@ -0,0 +1,106 @@
+"""
+Snapshot module for the Contact Manager 2.0 project.
+
+Loading contacts.json means parsing the JSON and building a Contact for
+every record, which takes seconds for a large store. A snapshot is a binary
+copy of the same contacts (contacts.json -> contacts.json.snap) that Python
+can read back almost instantly: three columns (names, phones, emails)
+written with the marshal module.
+
+The snapshot is only a cache. It records the size, modification time and a
+hash of the JSON file it was made from, and it is only used while the JSON
+file still matches all three. Otherwise (or if it is damaged) the JSON file
+is read as usual and a new snapshot is written.
+"""
+
+import hashlib
+import marshal
+import os
+from journal import atomic_write, file_hash
+
+
+MAGIC = b"CMSNAP1\n"
+
+
+def source_key(path, data=None):
+    """
+    Identify the version of a JSON file a snapshot belongs to.
+    
+    Args:
+        path (Path): The JSON file
+        data (bytes, optional): Its contents, if already in memory
+    
+    Returns:
+        tuple: (size, mtime_ns, hash)
+    """
+    st = os.stat(path)
+    if data is None:
+        digest = file_hash(path)
+    else:
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+    return st.st_size, st.st_mtime_ns, digest
+
+
+def columns(contacts):
+    """
+    Split contacts into the columns a snapshot stores.
+    
+    Args:
+        contacts (iterable): The contacts, in storage order
+    
+    Returns:
+        tuple: (names, phones, emails) lists
+    """
+    names, phones, emails = [], [], []
+    for contact in contacts:
+        names.append(contact.name)
+        phones.append(contact.phone)
+        emails.append(contact.email)
+    return names, phones, emails
+
+
+def write_snapshot(path, key, data):
+    """
+    Write a snapshot.
+    
+    Args:
+        path (Path): Snapshot file to write
+        key (tuple): source_key() of the JSON file holding the same contacts,
+            taken before that file was read
+        data (tuple): The contacts, as returned by columns()
+    """
+    names, phones, emails = data
+    payload = marshal.dumps((key, names, phones, emails))
+    # No fsync: a snapshot lost in a crash is simply rebuilt
+    atomic_write(path, MAGIC + payload, fsync=False)
+
+
+def read_snapshot(path, source):
+    """
+    Read a snapshot if it still matches its JSON file.
+    
+    Args:
+        path (Path): Snapshot file
+        source (Path): The JSON file it was made from
+    
+    Returns:
+        tuple or None: (names, phones, emails) columns, or None if the
+            snapshot is missing, damaged or out of date
+    """
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+        if not data.startswith(MAGIC):
+            return None
+        key, names, phones, emails = marshal.loads(memoryview(data)[len(MAGIC):])
+        st = os.stat(source)
+        # Size and time are checked first because they are free; the hash
+        # catches edits that kept both (coarse timestamps, restored backups).
+        if tuple(key[:2]) != (st.st_size, st.st_mtime_ns) or key[2] != file_hash(source):
+            return None
+    except (OSError, EOFError, ValueError, TypeError, IndexError):
+        return None
+    
+    if not len(names) == len(phones) == len(emails):
+        return None
+    return names, phones, emails
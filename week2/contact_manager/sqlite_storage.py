@@ -0,0 +1,423 @@
+"""
+SQLite storage module for the Contact Manager 2.0 project.
+
+For very large address books, keeping every contact in a Python list and
+rewriting a JSON file on each change doesn't scale. SQLiteContactStorage
+keeps the contacts in a SQLite database (using the built-in sqlite3 module)
+and offers the same methods as ContactStorage, so main.py can use either.
+
+It demonstrates:
+- Using a database instead of a flat file
+- Indexes for fast lookups
+- Transactions (all-or-nothing groups of changes)
+"""
+
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from contact import Contact
+import exporters
+import formats
+from streaming import ContactReader
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    name      TEXT NOT NULL,
+    phone     TEXT NOT NULL,
+    email     TEXT,
+    name_key  TEXT NOT NULL,
+    email_key TEXT
+);
+CREATE INDEX IF NOT EXISTS contacts_by_name ON contacts (name_key, phone);
+CREATE INDEX IF NOT EXISTS contacts_by_phone ON contacts (phone);
+CREATE INDEX IF NOT EXISTS contacts_by_email ON contacts (email_key);
+"""
+
+# The SQL text never changes, only the parameters do, so sqlite3 compiles
+# each statement once and reuses it from its statement cache.
+SELECT = "SELECT name, phone, email FROM contacts"
+SELECT_ALL = SELECT + " ORDER BY id"
+SELECT_ID_BY_NAME = "SELECT id, name, phone, email FROM contacts WHERE name_key = ? ORDER BY id LIMIT 1"
+SELECT_MATCHES = (SELECT + " WHERE instr(name_key, ?) OR instr(phone, ?) OR instr(email_key, ?)"
+                  " ORDER BY id")
+SELECT_PREFIX = ("SELECT name FROM contacts WHERE id IN (SELECT MIN(id) FROM contacts"
+                 " WHERE name_key >= ? AND name_key < ? GROUP BY name_key"
+                 " ORDER BY name_key LIMIT ?) ORDER BY name_key")
+EXISTS = "SELECT 1 FROM contacts WHERE name_key = ? AND phone = ? LIMIT 1"
+INSERT = "INSERT INTO contacts (name, phone, email, name_key, email_key) VALUES (?, ?, ?, ?, ?)"
+UPDATE = "UPDATE contacts SET name = ?, phone = ?, email = ?, name_key = ?, email_key = ? WHERE id = ?"
+DELETE = "DELETE FROM contacts WHERE id = ?"
+COUNT = "SELECT COUNT(*) FROM contacts"
+
+
+def _row(name, phone, email):
+    """Column values for a contact, including the case-folded lookup keys."""
+    return (name, phone, email, name.lower(), email.lower() if email else None)
+
+
+def _contact(row):
+    """Build a Contact from a (name, phone, email) row."""
+    return Contact(*row)
+
+
+class SQLiteContactStorage:
+    """
+    Stores contacts in a SQLite database.
+    
+    Has the same methods as ContactStorage. Note that contacts returned by
+    get_by_name/find are copies: change them through update().
+    
+    Attributes:
+        filepath (Path): Path to the database file
+        conn (sqlite3.Connection): The open database connection
+    
+    Example:
+        >>> storage = SQLiteContactStorage("contacts.db")
+        >>> storage.add(Contact("Alice", "123-456-7890"))
+        >>> storage.get_by_name("alice")
+    """
+    
+    def __init__(self, filepath="contacts.db"):
+        """
+        Open (or create) the database.
+        
+        Args:
+            filepath (str): Path to the SQLite database file
+        """
+        self.filepath = Path(filepath)
+        self.filepath.parent.mkdir(parents=True, exist_ok=True)
+        
+        # isolation_level=None: each statement commits on its own unless
+        # we open a transaction explicitly (see batch()).
+        self.conn = sqlite3.connect(self.filepath, isolation_level=None,
+                                    cached_statements=64)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._batch_depth = 0
+    
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+    
+    def load(self):
+        """Nothing to do: the data is read from the database on demand."""
+    
+    def save(self):
+        """
+        Nothing to do: every change is written when it is made.
+        
+        Returns:
+            bool: Always True
+        """
+        return True
+    
+    @contextmanager
+    def batch(self):
+        """
+        Run several changes in one transaction.
+        
+        If the block raises, none of its changes are kept.
+        A batch opened inside another batch is part of the outer one.
+        """
+        if self._batch_depth:
+            yield self
+            return
+        
+        self.conn.execute("BEGIN")
+        self._batch_depth = 1
+        try:
+            yield self
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        else:
+            self.conn.execute("COMMIT")
+        finally:
+            self._batch_depth = 0
+    
+    def _exists(self, name, phone):
+        """Check whether a contact with this identity is stored."""
+        return self.conn.execute(EXISTS, (name.lower(), phone)).fetchone() is not None
+    
+    def add(self, contact):
+        """
+        Add a contact.
+        
+        Args:
+            contact (Contact): The contact to add
+        
+        Returns:
+            bool: True if added successfully
+        """
+        if self._exists(contact.name, contact.phone):
+            print(f"Contact '{contact.name}' already exists!")
+            return False
+        
+        self.conn.execute(INSERT, _row(contact.name, contact.phone, contact.email))
+        return True
+    
+    def add_many(self, contacts):
+        """
+        Add several contacts in one transaction.
+        
+        Args:
+            contacts (iterable): Contact objects to add
+        
+        Returns:
+            int: How many were added (duplicates are skipped)
+        """
+        with self.batch():
+            return sum(1 for contact in contacts if self.add(contact))
+    
+    def import_file(self, path, rejects=None, chunk_size=10_000):
+        """
+        Import contacts from a CSV, JSON or vCard file (see formats.py).
+        
+        Works like ContactStorage.import_file(): invalid records go to a
+        reject file, duplicates are skipped, and everything is added in one
+        transaction.
+        
+        Args:
+            path (str): File to import; the format comes from its extension
+            rejects (str, optional): Where to write the rejected records
+                (default: formats.rejects_path(path))
+            chunk_size (int): Records to check and insert at a time
+        
+        Returns:
+            tuple: (added, duplicates, rejected) counts
+        
+        Raises:
+            ValueError: If the format is unknown or the file is damaged
+            OSError: If the file can't be read
+        """
+        records = formats.read_records(path)
+        added = duplicates = 0
+        rejected = []
+        with self.batch():
+            for chunk in formats.chunks(records, chunk_size):
+                rows = []
+                seen = set()  # Earlier chunks are already in the table
+                for contact in formats.to_contacts(chunk, rejected):
+                    key = contact.key
+                    if key in seen or self._exists(contact.name, contact.phone):
+                        duplicates += 1
+                    else:
+                        seen.add(key)
+                        rows.append(_row(contact.name, contact.phone, contact.email))
+                self.conn.executemany(INSERT, rows)
+                added += len(rows)
+        
+        if rejected:
+            formats.write_rejects(rejects or formats.rejects_path(path), rejected)
+        return added, duplicates, len(rejected)
+    
+    def export_csv(self, path, compression=None, shards=1, workers=None):
+        """
+        Export the contacts to CSV, see exporters.export_csv().
+        
+        Args:
+            path (str): File to write
+            compression (str, optional): "gzip", "bz2" or "lzma"
+            shards (int): Number of files to split the contacts into
+            workers (int, optional): Processes writing shards at once
+                (ignored: shards are written in turn)
+        
+        Returns:
+            tuple: (rows written, seconds taken, list of files written)
+        """
+        # Reads the contacts from the database as it goes, so they are
+        # never all in memory; the shards are written one after another
+        return exporters.export_csv(self, path, compression, shards, workers=1)
+    
+    def remove(self, name):
+        """
+        Remove a contact by name.
+        
+        Args:
+            name (str): Name of the contact to remove
+        
+        Returns:
+            bool: True if removed, False if not found
+        """
+        row = self.conn.execute(SELECT_ID_BY_NAME, (name.lower(),)).fetchone()
+        if row is None:
+            return False
+        
+        self.conn.execute(DELETE, (row[0],))
+        return True
+    
+    def find(self, query):
+        """
+        Find contacts matching a search query.
+        
+        Same rules as Contact.matches: a case-insensitive substring of the
+        name or email, or a substring of the phone.
+        
+        Args:
+            query (str): Search string to match against name, phone, or email
+        
+        Returns:
+            list: List of matching Contact objects
+        """
+        query = query.lower()
+        rows = self.conn.execute(SELECT_MATCHES, (query, query, query))
+        return [_contact(row) for row in rows]
+    
+    def complete(self, prefix, limit=10):
+        """
+        Suggest contact names that start with some text.
+        
+        Args:
+            prefix (str): The start of a name (case doesn't matter)
+            limit (int): Maximum number of suggestions
+        
+        Returns:
+            list: Distinct names in alphabetical order
+        """
+        prefix = prefix.lower()
+        # Every key starting with the prefix sorts between these two bounds,
+        # so the name index can answer this as a range scan.
+        rows = self.conn.execute(SELECT_PREFIX, (prefix, prefix + "\U0010ffff", limit))
+        return [row[0] for row in rows]
+    
+    def get_all(self):
+        """
+        Get all contacts.
+        
+        Returns:
+            list: All contacts, oldest first
+        """
+        return [_contact(row) for row in self.conn.execute(SELECT_ALL)]
+    
+    def get_by_name(self, name):
+        """
+        Get a specific contact by exact name.
+        
+        Args:
+            name (str): Exact name to search for
+        
+        Returns:
+            Contact or None: The contact if found
+        """
+        row = self.conn.execute(SELECT_ID_BY_NAME, (name.lower(),)).fetchone()
+        return None if row is None else _contact(row[1:])
+    
+    def update(self, name, **kwargs):
+        """
+        Update a contact's information.
+        
+        Args:
+            name (str): Name of the contact to update
+            **kwargs: Fields to update (phone, email, new_name)
+        
+        Returns:
+            bool: True if updated successfully, False if the contact wasn't
+                found or the change would duplicate another contact
+        """
+        row = self.conn.execute(SELECT_ID_BY_NAME, (name.lower(),)).fetchone()
+        if row is None:
+            return False
+        cid, old_name, old_phone, email = row
+        
+        new_name = kwargs.get("new_name", old_name)
+        new_phone = kwargs.get("phone", old_phone)
+        email = kwargs.get("email", email)
+        if ((new_name.lower(), new_phone) != (old_name.lower(), old_phone)
+                and self._exists(new_name, new_phone)):
+            print(f"Contact '{new_name}' already exists!")
+            return False
+        
+        self.conn.execute(UPDATE, _row(new_name, new_phone, email) + (cid,))
+        return True
+    
+    def update_many(self, changes):
+        """
+        Update several contacts in one transaction.
+        
+        Args:
+            changes (dict or iterable): Maps each contact name to a dict of
+                fields to update (see update), or (name, fields) pairs
+        
+        Returns:
+            int: How many contacts were updated
+        """
+        if isinstance(changes, dict):
+            changes = changes.items()
+        with self.batch():
+            return sum(1 for name, fields in changes if self.update(name, **fields))
+    
+    def migrate_from_json(self, json_path):
+        """
+        Copy every contact from a contacts.json file into the database.
+        
+        The JSON file is streamed, so it never has to fit in memory, and
+        all rows go in with one transaction. Contacts already in the
+        database (and duplicates within the file) are skipped.
+        
+        Args:
+            json_path (str): Path to the JSON file
+        
+        Returns:
+            int: How many contacts were copied
+        """
+        seen = {(row[0], row[1]) for row in self.conn.execute("SELECT name_key, phone FROM contacts")}
+        reader = ContactReader(json_path)
+        
+        def new_rows():
+            for contact in reader:
+                if contact.key not in seen:
+                    seen.add(contact.key)
+                    yield _row(contact.name, contact.phone, contact.email)
+        
+        with self.batch():
+            before = len(self)
+            self.conn.executemany(INSERT, new_rows())
+            copied = len(self) - before
+        
+        if reader.error:
+            print(f"Warning: {json_path} is corrupted ({reader.error}).")
+        print(f"Migrated {copied} contacts from {json_path} to {self.filepath}")
+        return copied
+    
+    def __len__(self):
+        """Return the number of contacts."""
+        return self.conn.execute(COUNT).fetchone()[0]
+    
+    def __iter__(self):
+        """Iterate over contacts, reading them from the database as we go."""
+        return (_contact(row) for row in self.conn.execute(SELECT_ALL))
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import tempfile
+    
+    print("Testing SQLiteContactStorage...")
+    
+    with tempfile.TemporaryDirectory() as folder:
+        storage = SQLiteContactStorage(Path(folder) / "test_contacts.db")
+        
+        storage.add(Contact("Alice Smith", "123-456-7890", "alice@email.com"))
+        storage.add(Contact("Bob Jones", "098-765-4321", "bob@email.com"))
+        storage.add(Contact("Charlie Brown", "555-1234"))
+        storage.add(Contact("alice smith", "123-456-7890"))  # Duplicate
+        
+        print(f"\nAll contacts ({len(storage)} total):")
+        for contact in storage:
+            print(f"  - {contact}")
+        
+        print("\nSearching for 'ali':")
+        for contact in storage.find("ali"):
+            print(f"  - {contact}")
+        
+        storage.update("Charlie Brown", email="charlie@email.com")
+        print(f"\nAfter update: {storage.get_by_name('Charlie Brown')}")
+        
+        copied = storage.migrate_from_json(Path(__file__).with_name("contacts.json"))
+        print(f"Now {len(storage)} contacts ({copied} from contacts.json)")
+        storage.close()
+    
+    print("\nTest complete! (test database deleted)")
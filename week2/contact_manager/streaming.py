@@ -0,0 +1,218 @@
+"""
+Streaming reader for the Contact Manager 2.0 project.
+
+json.load() needs the whole file in memory and then builds every Contact at
+once. ContactReader instead parses the top-level JSON array one record at a
+time, so a huge contacts.json can be scanned, filtered or indexed while only
+a small window of it is held in memory.
+
+If the file is damaged part way through, the reader stops at the damage and
+everything before it is still returned.
+
+Example:
+    >>> reader = ContactReader("contacts.json")
+    >>> gmail = [c for c in reader if c.email and "gmail" in c.email]
+    >>> reader.error is None
+    True
+"""
+
+import codecs
+import json
+import os
+import re
+from pathlib import Path
+from contact import Contact
+
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class ContactReader:
+    """
+    Iterates over the contacts in a JSON array file without loading it all.
+    
+    After (or during) iteration, these attributes describe the read:
+    
+    Attributes:
+        path (Path): The file being read
+        count (int): Contacts returned so far
+        skipped (int): Records that were valid JSON but not valid contacts
+        bytes_read (int): How far into the file the reader has got
+        total_bytes (int): Size of the file
+        error (str or None): Why reading stopped early, if it did
+    """
+    
+    def __init__(self, path, progress=None, progress_every=10000,
+                 chunk_size=64 * 1024, max_record_size=1024 * 1024):
+        """
+        Initialize the reader.
+        
+        Args:
+            path (str): Path to the JSON file
+            progress (callable, optional): Called as
+                progress(count, bytes_read, total_bytes) every
+                `progress_every` contacts and once at the end
+            progress_every (int): How often to report progress
+            chunk_size (int): Bytes to read from the file at a time
+            max_record_size (int): A record that doesn't parse within this
+                many characters is treated as corruption
+        """
+        self.path = Path(path)
+        self.progress = progress
+        self.progress_every = progress_every
+        self.chunk_size = chunk_size
+        self.max_record_size = max_record_size
+        self.count = 0
+        self.skipped = 0
+        self.bytes_read = 0
+        self.total_bytes = 0
+        self.error = None
+    
+    def __iter__(self):
+        """Yield Contact objects in file order."""
+        try:
+            for value in self.values():
+                try:
+                    contact = Contact.from_dict(value)
+                except (AttributeError, TypeError, ValueError):
+                    self.skipped += 1
+                    continue
+                self.count += 1
+                if self.progress and self.count % self.progress_every == 0:
+                    self.progress(self.count, self.bytes_read, self.total_bytes)
+                yield contact
+        finally:
+            if self.progress:
+                self.progress(self.count, self.bytes_read, self.total_bytes)
+    
+    def values(self):
+        """
+        Yield the records as parsed JSON values, without turning them into
+        contacts (so nothing is checked or skipped).
+        """
+        self.count = self.skipped = self.bytes_read = 0
+        self.error = None
+        
+        with open(self.path, "rb") as file:
+            self._file = file
+            self._text = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            self._buf, self._pos, self._eof = "", 0, False
+            self.total_bytes = os.fstat(file.fileno()).st_size
+            
+            try:
+                yield from self._values()
+            finally:
+                self._buf = ""
+                self._file = None
+    
+    def _values(self):
+        """Walk the array: '[' value (',' value)* ']'."""
+        if self._peek() != "[":
+            self.error = "file does not start with a JSON array"
+            return
+        self._pos += 1
+        if self._peek() == "]":
+            return
+        
+        decoder = json.JSONDecoder()
+        parsed = 0
+        while True:
+            value = self._value(decoder, parsed)
+            if self.error:
+                return
+            parsed += 1
+            yield value
+            
+            separator = self._peek()
+            if separator == "]":
+                return
+            if separator != ",":
+                self.error = f"unexpected data after record {parsed}"
+                return
+            self._pos += 1
+    
+    def _fill(self):
+        """Read the next chunk into the buffer, dropping what was parsed."""
+        data = self._file.read(self.chunk_size)
+        self.bytes_read += len(data)
+        self._eof = not data
+        self._buf = self._buf[self._pos:] + self._text.decode(data, final=self._eof)
+        self._pos = 0
+    
+    def _peek(self):
+        """Skip whitespace and return the next character ('' at the end)."""
+        while True:
+            self._pos = WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if self._eof:
+                return ""
+            self._fill()
+    
+    def _value(self, decoder, parsed):
+        """Parse the next JSON value, reading more of the file as needed."""
+        self._peek()
+        while True:
+            try:
+                value, self._pos = decoder.raw_decode(self._buf, self._pos)
+                return value
+            except json.JSONDecodeError:
+                # Either the record is cut off by the end of the buffer, or
+                # it is really broken. Only more data can tell them apart.
+                if self._eof or len(self._buf) - self._pos > self.max_record_size:
+                    self.error = f"damaged record after {parsed} records"
+                    return None
+                self._fill()
+
+
+def iter_contacts(path, progress=None):
+    """
+    Yield the contacts in a JSON file one at a time.
+    
+    Args:
+        path (str): Path to the JSON file
+        progress (callable, optional): See ContactReader
+    
+    Returns:
+        iterator: Contact objects in file order
+    """
+    return iter(ContactReader(path, progress=progress))
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    
+    print("Testing ContactReader...")
+    
+    with tempfile.TemporaryDirectory() as folder:
+        if len(sys.argv) > 1:
+            path = sys.argv[1]
+        else:
+            # A sample file, with one invalid contact to skip
+            path = Path(folder) / "test_contacts.json"
+            path.write_text(json.dumps([
+                {"name": "Alice Smith", "phone": "123-456-7890", "email": "alice@email.com"},
+                {"name": "Bob Jones", "phone": "098-765-4321", "email": "bob@email.com"},
+                {"name": "Charlie Brown", "phone": "555-1234", "email": "charlie@work.org"},
+                {"name": "", "phone": "555-0000"},
+            ], indent=2))
+        
+        reader = ContactReader(
+            path,
+            progress=lambda n, done, total: print(f"  {n} contacts ({done}/{total} bytes)"),
+        )
+        
+        domains = {}
+        for contact in reader:
+            if contact.email:
+                domain = contact.email.rsplit("@", 1)[-1].lower()
+                domains[domain] = domains.get(domain, 0) + 1
+    
+    print(f"\nRead {reader.count} contacts, skipped {reader.skipped}")
+    if reader.error:
+        print(f"Stopped early: {reader.error}")
+    for domain, n in sorted(domains.items(), key=lambda item: -item[1]):
+        print(f"  {domain}: {n}")
+    print("\nTest complete!")
@@ -0,0 +1,350 @@
+"""
+Columnar contact table for the Contact Manager 2.0 project.
+
+ContactStorage keeps one Contact object per row, which is what you want for
+adding, editing and deleting single contacts. For analysis-style questions
+("everyone at example.com", "contacts without an email") it is faster and
+smaller to keep each field in its own column and test a whole column at
+once. That is what ContactTable does.
+
+If NumPy is installed, the columns are NumPy string arrays and the tests run
+inside NumPy. Otherwise plain Python lists are used, with masks stored as one
+byte per row.
+
+Example:
+    >>> table = ContactTable.from_json("contacts.json")
+    >>> no_email = table.filter(table.missing("email"))
+    >>> at_example = table.filter(table.endswith("email", "@example.com"))
+    >>> at_example.export_csv("example_contacts.csv")
+"""
+
+import csv
+import json
+import operator
+from pathlib import Path
+from contact import Contact
+from streaming import ContactReader
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+
+COLUMNS = ("name", "phone", "email")
+
+
+class Mask:
+    """
+    One True/False value per row, for the pure-Python backend.
+    
+    Supports the same operators as a NumPy boolean array:
+    & (and), | (or) and ~ (not).
+    """
+    
+    __slots__ = ("bits",)
+    
+    def __init__(self, bits):
+        self.bits = bytes(bits)
+    
+    def __and__(self, other):
+        return Mask(map(operator.and_, self.bits, other.bits))
+    
+    def __or__(self, other):
+        return Mask(map(operator.or_, self.bits, other.bits))
+    
+    def __invert__(self):
+        return Mask(self.bits.translate(bytes([1, 0]) + bytes(254)))
+    
+    def __len__(self):
+        return len(self.bits)
+    
+    def __iter__(self):
+        return (bool(b) for b in self.bits)
+    
+    def sum(self):
+        """Number of rows that are True."""
+        return self.bits.count(1)
+
+
+class ContactTable:
+    """
+    Contacts stored as three parallel columns: name, phone and email.
+    
+    A missing email is stored as an empty string. Predicates such as
+    contains() and missing() return a mask with one value per row; masks can
+    be combined with &, | and ~ and passed to filter() or count().
+    
+    Attributes:
+        names: The name column
+        phones: The phone column
+        emails: The email column ("" where there is no email)
+        numpy (bool): True if the columns are NumPy arrays
+    """
+    
+    def __init__(self, names, phones, emails, use_numpy=None):
+        """
+        Build a table from three columns of equal length.
+        
+        Args:
+            names (sequence): Names
+            phones (sequence): Phone numbers
+            emails (sequence): Emails (None or "" for no email)
+            use_numpy (bool, optional): Force NumPy on or off. By default it
+                is used if it is installed.
+        """
+        if not len(names) == len(phones) == len(emails):
+            raise ValueError("Columns must have the same length")
+        
+        self.numpy = np is not None if use_numpy is None else use_numpy
+        if self.numpy and np is None:
+            raise ValueError("NumPy is not installed")
+        
+        emails = [e or "" for e in emails]
+        if self.numpy:
+            self.names = np.array(names, dtype=str)
+            self.phones = np.array(phones, dtype=str)
+            self.emails = np.array(emails, dtype=str)
+        else:
+            self.names = list(names)
+            self.phones = list(phones)
+            self.emails = emails
+        self._folded = {}  # column -> lower-cased copy, made on first use
+    
+    @classmethod
+    def from_contacts(cls, contacts, use_numpy=None):
+        """
+        Build a table from Contact objects.
+        
+        Args:
+            contacts (iterable): Contacts (a ContactStorage works too)
+            use_numpy (bool, optional): See __init__
+        
+        Returns:
+            ContactTable: The new table
+        """
+        names, phones, emails = [], [], []
+        for contact in contacts:
+            names.append(contact.name)
+            phones.append(contact.phone)
+            emails.append(contact.email)
+        return cls(names, phones, emails, use_numpy)
+    
+    @classmethod
+    def from_storage(cls, storage, use_numpy=None):
+        """Build a table from a ContactStorage (or SQLiteContactStorage)."""
+        return cls.from_contacts(storage, use_numpy)
+    
+    @classmethod
+    def from_json(cls, path, use_numpy=None):
+        """
+        Build a table straight from a contacts.json file.
+        
+        The file is streamed, so the Contact objects are never all in memory
+        at the same time.
+        """
+        return cls.from_contacts(ContactReader(path), use_numpy)
+    
+    def rows(self):
+        """Iterate over (name, phone, email) tuples, email None if missing."""
+        for name, phone, email in zip(self.names, self.phones, self.emails):
+            yield str(name), str(phone), str(email) or None
+    
+    def to_contacts(self):
+        """
+        Convert the table back to Contact objects.
+        
+        Returns:
+            list: One Contact per row
+        """
+        return [Contact.from_dict({"name": n, "phone": p, "email": e}, trusted=True)
+                for n, p, e in self.rows()]
+    
+    def to_storage(self, storage):
+        """
+        Add every row to a storage, saving once.
+        
+        Args:
+            storage (ContactStorage): Where to add the contacts
+        
+        Returns:
+            int: How many were added (duplicates are skipped)
+        """
+        return storage.add_many(self.to_contacts())
+    
+    def to_json(self, path):
+        """Write the table in the same format as contacts.json."""
+        data = [{"name": n, "phone": p, "email": e} for n, p, e in self.rows()]
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=2, ensure_ascii=False)
+    
+    def export_csv(self, path):
+        """
+        Write the table as CSV (same columns as main.export_to_csv).
+        
+        Returns:
+            int: Number of rows written
+        """
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["Name", "Phone", "Email"])
+            writer.writerows(zip(self.names, self.phones, self.emails))
+        return len(self)
+    
+    def _column(self, column, fold=False):
+        """Get a column by name, lower-cased if `fold` is True."""
+        if column not in COLUMNS:
+            raise ValueError(f"Unknown column: {column}")
+        values = getattr(self, column + "s")
+        if not fold:
+            return values
+        if column not in self._folded:
+            if self.numpy:
+                self._folded[column] = np.char.lower(values)
+            else:
+                self._folded[column] = [v.lower() for v in values]
+        return self._folded[column]
+    
+    def contains(self, column, text, case=False):
+        """
+        Rows where the column contains `text`.
+        
+        Args:
+            column (str): "name", "phone" or "email"
+            text (str): Substring to look for
+            case (bool): Match case exactly (default: ignore case)
+        """
+        if not case:
+            text = text.lower()
+        values = self._column(column, fold=not case)
+        if self.numpy:
+            return np.char.find(values, text) >= 0
+        return Mask(text in v for v in values)
+    
+    def startswith(self, column, prefix, case=False):
+        """Rows where the column starts with `prefix`."""
+        if not case:
+            prefix = prefix.lower()
+        values = self._column(column, fold=not case)
+        if self.numpy:
+            return np.char.startswith(values, prefix)
+        return Mask(v.startswith(prefix) for v in values)
+    
+    def endswith(self, column, suffix, case=False):
+        """Rows where the column ends with `suffix` (e.g. an email domain)."""
+        if not case:
+            suffix = suffix.lower()
+        values = self._column(column, fold=not case)
+        if self.numpy:
+            return np.char.endswith(values, suffix)
+        return Mask(v.endswith(suffix) for v in values)
+    
+    def equals(self, column, value, case=False):
+        """Rows where the column is exactly `value`."""
+        if not case:
+            value = value.lower()
+        values = self._column(column, fold=not case)
+        if self.numpy:
+            return values == value
+        return Mask(v == value for v in values)
+    
+    def missing(self, column):
+        """Rows where the column is empty (e.g. no email)."""
+        return self.equals(column, "", case=True)
+    
+    def matches(self, query):
+        """Rows that Contact.matches(query) would accept."""
+        query = query.lower()
+        if self.numpy:
+            return ((np.char.find(self._column("name", fold=True), query) >= 0)
+                    | (np.char.find(self.phones, query) >= 0)
+                    | (np.char.find(self._column("email", fold=True), query) >= 0))
+        names = self._column("name", fold=True)
+        emails = self._column("email", fold=True)
+        return Mask(query in n or query in p or query in e
+                    for n, p, e in zip(names, self.phones, emails))
+    
+    def filter(self, mask):
+        """
+        Keep only the rows where the mask is True.
+        
+        Returns:
+            ContactTable: A new table
+        """
+        if self.numpy:
+            return self._take(np.flatnonzero(mask))
+        return self._take([i for i, keep in enumerate(mask.bits) if keep])
+    
+    def _take(self, rows):
+        """New table with the given row numbers, in that order."""
+        table = ContactTable.__new__(ContactTable)
+        table.numpy = self.numpy
+        if self.numpy:
+            table.names, table.phones, table.emails = (
+                self.names[rows], self.phones[rows], self.emails[rows])
+        else:
+            table.names = [self.names[i] for i in rows]
+            table.phones = [self.phones[i] for i in rows]
+            table.emails = [self.emails[i] for i in rows]
+        table._folded = {}
+        return table
+    
+    def count(self, mask):
+        """Number of rows where the mask is True."""
+        return int(mask.sum())
+    
+    def find(self, query):
+        """
+        Find rows matching a search query (same rules as ContactStorage.find).
+        
+        Returns:
+            ContactTable: The matching rows, in order
+        """
+        return self.filter(self.matches(query))
+    
+    def dedupe(self):
+        """
+        Drop duplicate rows, keeping the first of each.
+        
+        Rows are duplicates under the same rule as Contact.__eq__: same name
+        (ignoring case) and same phone.
+        
+        Returns:
+            ContactTable: A new table without the duplicates
+        """
+        names = self._column("name", fold=True)
+        if self.numpy:
+            keys = np.char.add(np.char.add(names, "\x00"), self.phones)
+            _, first = np.unique(keys, return_index=True)
+            return self._take(np.sort(first))
+        
+        seen = {}
+        for i, key in enumerate(zip(names, self.phones)):
+            seen.setdefault(key, i)
+        return self._take(sorted(seen.values()))
+    
+    def __len__(self):
+        """Return the number of rows."""
+        return len(self.names)
+    
+    def __iter__(self):
+        """Iterate over the rows as Contact objects."""
+        return iter(self.to_contacts())
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    path = Path(__file__).with_name("contacts.json")
+    table = ContactTable.from_json(path)
+    backend = "NumPy" if table.numpy else "pure Python"
+    print(f"Loaded {len(table)} contacts into a table ({backend})")
+    
+    print(f"\nWithout email: {table.count(table.missing('email'))}")
+    print(f"At example.com: {table.count(table.endswith('email', '@example.com'))}")
+    
+    print("\nSearching for 'ali':")
+    for contact in table.find("ali"):
+        print(f"  - {contact}")
+    
+    doubled = ContactTable.from_contacts(list(table) + list(table))
+    print(f"\nDoubled: {len(doubled)} rows, after dedupe: {len(doubled.dedupe())}")
@@ -0,0 +1,120 @@
+"""
+Background writer module for the Contact Manager 2.0 project.
+
+Saving rewrites the whole contacts file, so several quick edits in a row
+each wait for the disk. A BackgroundWriter takes that off the caller: a
+change only marks the storage as dirty, and a background thread saves once
+things have been quiet for a moment. A burst of edits costs one save.
+
+To keep the data safe:
+- a save happens at the latest `max_delay` seconds after the first unsaved
+  change, even if changes keep coming
+- flush() saves right away (and waits for a save already in progress)
+- everything still unsaved is flushed when the program exits
+"""
+
+import atexit
+import threading
+import time
+
+
+class BackgroundWriter:
+    """
+    Calls a save function from a background thread, debounced.
+    
+    Attributes:
+        quiet (float): Seconds without changes before saving
+        max_delay (float): Most seconds a change waits to be saved
+    """
+    
+    def __init__(self, save, quiet=1.0, max_delay=5.0):
+        """
+        Start the writer thread.
+        
+        Args:
+            save (callable): Writes everything; returns True on success
+            quiet (float): Seconds without changes before saving
+            max_delay (float): Most seconds a change waits to be saved
+        """
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self._save = save
+        self._condition = threading.Condition()
+        self._first_change = self._last_change = None  # None: nothing unsaved
+        self._saving = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="contact-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+    
+    @property
+    def dirty(self):
+        """True if there are changes that haven't been saved yet."""
+        # Including the ones a save in progress is writing
+        return self._first_change is not None or self._saving
+    
+    def mark_dirty(self):
+        """Note that something changed; it will be saved soon."""
+        with self._condition:
+            now = time.monotonic()
+            if self._first_change is None:
+                self._first_change = now
+            self._last_change = now
+            self._condition.notify_all()
+    
+    def _write(self):
+        """Save now. Called with the condition held; releases it while saving."""
+        self._first_change = self._last_change = None
+        self._saving = True
+        self._condition.release()
+        try:
+            saved = self._save()
+        finally:
+            self._condition.acquire()
+            self._saving = False
+            self._condition.notify_all()
+        if not saved and self._first_change is None:
+            # Try again later rather than dropping the changes
+            self._first_change = self._last_change = time.monotonic()
+        return saved
+    
+    def _run(self):
+        """The writer thread: wait for changes, then save when they are due."""
+        with self._condition:
+            while True:
+                if self._saving:
+                    self._condition.wait()
+                elif self._first_change is None:
+                    if self._closed:
+                        return
+                    self._condition.wait()
+                else:
+                    due = min(self._last_change + self.quiet,
+                              self._first_change + self.max_delay)
+                    delay = due - time.monotonic()
+                    if delay > 0 and not self._closed:
+                        self._condition.wait(delay)
+                    elif self._write() is False and self._closed:
+                        return
+    
+    def flush(self):
+        """
+        Save any unsaved changes now, on the calling thread.
+        
+        Returns:
+            bool: True if everything is saved
+        """
+        with self._condition:
+            while self._saving:
+                self._condition.wait()
+            if self._first_change is None:
+                return True
+            return self._write()
+    
+    def close(self):
+        """Save any unsaved changes and stop the thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        atexit.unregister(self.close)